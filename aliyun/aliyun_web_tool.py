@@ -10,9 +10,18 @@
 from http import HTTPStatus
 from dashscope.audio.asr import Transcription
 from urllib import request as urlrequest
+import asyncio
+import collections
 import dashscope
+import functools
+import hashlib
+import ijson
+import itertools
 import os
 import json
+import shutil
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
@@ -22,38 +31,162 @@ load_dotenv()
 BASE_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = BASE_DIR.parent
 RESULT_DIR = BASE_DIR / "results"
-HISTORY_FILE = BASE_DIR / "aliyun_history.json"
-
-
+# 识别结果缓存目录：{sha256(file_url)}.json，同一个音频 URL 再次识别时直接复用
+CACHE_DIR = RESULT_DIR / "cache"
+HISTORY_FILE = BASE_DIR / "aliyun_history.jsonl"
+# 旧版整文件 JSON 历史记录，首次导入时迁移为 JSONL
+LEGACY_HISTORY_FILE = BASE_DIR / "aliyun_history.json"
+# 历史记录保留条数
+HISTORY_LIMIT = 200
+_HISTORY_LOCK = threading.Lock()
+# 历史记录偏移索引 (文件签名, {记录 ID: 字节偏移})，由 _history_index 维护
+_HISTORY_INDEX = (None, None)
+
+# 轮询识别任务状态的退避间隔（秒），用尽后保持最后一个值
+POLL_BACKOFF = (1, 2, 5, 10)
+# 任务结束状态
+TERMINAL_STATUSES = {"SUCCEEDED", "FAILED", "CANCELED", "UNKNOWN"}
+# 识别结果 JSON 中句子所在的路径（ijson 前缀）
+SENTENCE_PREFIXES = ("transcripts.item.sentences.item", "sentences.item")
+# 下载识别结果时每次读写的块大小
+COPY_BUFSIZE = 1 << 20
+# 历史记录中预览文本的长度
+PREVIEW_CHARS = 300
+# 逐句日志每攒够多少句输出一次
+LOG_BATCH = 50
+# submit_recognition 提交的后台任务 {task_id: {status, message, record, logs, changed, finished_at}}
+# 结果推送完后由 pop_recognize_task 移除；没有人来取结果的任务结束超过 RECOGNIZE_TASK_TTL 秒后清理
+RECOGNIZE_TASKS = {}
+RECOGNIZE_TASK_TTL = 3600
+_TASKS_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
 def _init_api_key():
-    """从环境变量初始化阿里云 DashScope API Key"""
+    """
+    从环境变量初始化阿里云 DashScope API Key，进程内只执行一次。
+    未配置时抛出 ValueError（异常不会被缓存，配置后下次调用会重新读取）。
+    """
     api_key = os.getenv("DASHSCOPE_API_KEY") or os.getenv("ALIYUN_API_KEY")
     if not api_key:
         raise ValueError("未配置阿里云 API Key，请在 .env 中设置 DASHSCOPE_API_KEY 或 ALIYUN_API_KEY")
     print("[AliyunASR] 已从环境变量加载 API Key（不在终端打印具体值）")
     dashscope.api_key = api_key
+    return api_key
+
+
+def _migrate_legacy_history():
+    """
+    将旧版 aliyun_history.json（JSON 数组，最新在前）一次性转换为 JSONL（每行一条，最新在后）。
+    转换完成后旧文件重命名为 .bak 保留。
+    """
+    if HISTORY_FILE.exists() or not LEGACY_HISTORY_FILE.exists():
+        return
+    try:
+        with LEGACY_HISTORY_FILE.open("r", encoding="utf-8") as f:
+            records = json.load(f)
+        with HISTORY_FILE.open("w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in reversed(records))
+        LEGACY_HISTORY_FILE.replace(LEGACY_HISTORY_FILE.with_suffix(".json.bak"))
+        print(f"[AliyunASR] 已将 {len(records)} 条历史记录迁移到 {HISTORY_FILE.name}")
+    except Exception as e:
+        print(f"迁移阿里云历史记录失败: {e}")
 
 
 def _load_history(limit=100):
+    """读取最近 limit 条历史记录（最新在前），只保留文件末尾 limit 行在内存中"""
     if not HISTORY_FILE.exists():
         return []
     try:
         with HISTORY_FILE.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data[:limit]
+            lines = collections.deque(f, maxlen=limit)
+        records = []
+        for line in reversed(lines):
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+        return records
     except Exception as e:
         print(f"加载阿里云历史记录失败: {e}")
         return []
 
 
-def _save_history(records):
+def _history_file_signature():
+    """历史文件的 (修改时间, 大小)，用于发现其他进程对文件的修改；文件不存在时返回 None"""
     try:
-        with HISTORY_FILE.open("w", encoding="utf-8") as f:
-            json.dump(records, f, indent=2, ensure_ascii=False)
+        st = HISTORY_FILE.stat()
+        return st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+
+def _scan_history_index():
+    """扫描一遍 HISTORY_FILE，建立 记录 ID -> 字节偏移 的索引"""
+    index = {}
+    if not HISTORY_FILE.exists():
+        return index
+    offset = 0
+    with HISTORY_FILE.open("rb") as f:
+        for line in f:
+            try:
+                record_id = json.loads(line).get("id")
+            except ValueError:
+                record_id = None
+            if record_id:
+                # 同一 ID 出现多次时以最新（靠后）的一条为准
+                index[record_id] = offset
+            offset += len(line)
+    return index
+
+
+def _history_index():
+    """
+    记录 ID -> 该记录在 HISTORY_FILE 中的字节偏移（调用方需持有 _HISTORY_LOCK）
+    按文件的 (修改时间, 大小) 缓存，其他进程追加或压缩文件后重新扫描，不会用过期的偏移读到错误的记录
+    """
+    global _HISTORY_INDEX
+    sig = _history_file_signature()
+    index_sig, index = _HISTORY_INDEX
+    if index is None or sig != index_sig:
+        index = _scan_history_index()
+        _HISTORY_INDEX = (sig, index)
+    return index
+
+
+def _compact_history():
+    """只保留最新的 HISTORY_LIMIT 条记录，调用方需持有 _HISTORY_LOCK"""
+    global _HISTORY_INDEX
+    with HISTORY_FILE.open("rb") as f:
+        lines = collections.deque(f, maxlen=HISTORY_LIMIT)
+    tmp_file = HISTORY_FILE.with_suffix(".jsonl.tmp")
+    with tmp_file.open("wb") as f:
+        f.writelines(lines)
+    tmp_file.replace(HISTORY_FILE)
+    _HISTORY_INDEX = (None, None)
+
+
+def _append_history(record):
+    """追加一条历史记录（一次 write），超过 HISTORY_LIMIT 的两倍时压缩文件"""
+    global _HISTORY_INDEX
+    try:
+        data = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with _HISTORY_LOCK:
+            index = _history_index()
+            with HISTORY_FILE.open("ab") as f:
+                offset = f.tell()
+                f.write(data)
+            index[record["id"]] = offset
+            # 本进程的追加已记入索引，更新签名避免下次重新扫描
+            _HISTORY_INDEX = (_history_file_signature(), index)
+            if len(index) > HISTORY_LIMIT * 2:
+                _compact_history()
     except Exception as e:
         print(f"保存阿里云历史记录失败: {e}")
 
 
+_migrate_legacy_history()
+
+
 def list_aliyun_history(limit=100):
     """提供给 Web 的历史查询接口"""
     return _load_history(limit=limit)
@@ -72,32 +205,272 @@ def get_latest_record_by_file_url(file_url: str):
     return None
 
 def get_record_by_id(record_id: str):
-    """根据 ID 获取一条历史记录"""
+    """根据 ID 获取一条历史记录（通过偏移索引直接定位，不解析整个文件）"""
     if not record_id:
         return None
-    history = _load_history(limit=10000)
-    for r in history:
-        if r.get("id") == record_id:
-            return r
-    return None
+    try:
+        with _HISTORY_LOCK:
+            offset = _history_index().get(record_id)
+            if offset is None:
+                return None
+            with HISTORY_FILE.open("rb") as f:
+                f.seek(offset)
+                return json.loads(f.readline())
+    except Exception as e:
+        print(f"读取阿里云历史记录失败: {e}")
+        return None
 
 
-def recognize_audio(file_url: str, log_callback=None) -> dict:
+async def _wait_transcription(task_id: str):
     """
-    调用阿里云 ASR 识别给定的音频 URL，并保存结果和历史记录。
-    
-    Args:
-        file_url: 音频文件的 URL
-        log_callback: 可选的日志回调函数，用于实时推送日志。函数签名: log_callback(message: str)
-    
-    Returns:
-        dict: {success: bool, message: str, record: dict(optional), logs: list(optional)}
+    以退避间隔轮询 Transcription.fetch，直到任务结束。
+    阻塞的 HTTP 调用放到线程中执行，等待期间不占用事件循环。
     """
-    # 日志收集列表
-    logs = []
-    
+    attempt = 0
+    while True:
+        response = await asyncio.to_thread(Transcription.fetch, task=task_id)
+        if response.status_code != HTTPStatus.OK:
+            return response
+        status = response.output.get("task_status") if response.output else None
+        if status in TERMINAL_STATUSES:
+            return response
+        await asyncio.sleep(POLL_BACKOFF[min(attempt, len(POLL_BACKOFF) - 1)])
+        attempt += 1
+
+
+class _TeeReader:
+    """包装 HTTP 响应：解析器每读一块数据，同时原样写入结果文件"""
+
+    def __init__(self, src, sink):
+        self._src = src
+        self._sink = sink
+
+    def read(self, n=-1):
+        data = self._src.read(n)
+        if data:
+            self._sink.write(data)
+        return data
+
+    def drain(self):
+        """解析器提前结束时，把剩余数据也写入结果文件，保证 JSON 完整"""
+        while self.read(COPY_BUFSIZE):
+            pass
+
+
+def _iter_sentences(fp):
+    """
+    从文件对象中增量解析识别结果的句子，内存中同一时间只保留一句。
+    兼容 transcripts[0].sentences 和顶层 sentences 两种结构。
+    """
+    builder = None
+    sentence_prefix = None
+    for prefix, event, value in ijson.parse(fp, buf_size=COPY_BUFSIZE, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == sentence_prefix and event == "end_map":
+                yield builder.value
+                builder = None
+        elif event == "start_map" and prefix in SENTENCE_PREFIXES:
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            sentence_prefix = prefix
+        elif prefix == "transcripts.item" and event == "end_map":
+            # 只处理第一个 transcript
+            return
+
+
+@functools.lru_cache(maxsize=1024)
+def _time_prefix(hours: int, minutes: int) -> str:
+    """时、分部分的字符串，相邻句子大多相同，缓存复用"""
+    if hours > 0:
+        return f"{hours}小时{minutes}分"
+    if minutes > 0:
+        return f"{minutes}分"
+    return ""
+
+
+def format_time(seconds):
+    """格式化为"X小时X分X.XX秒"，保留毫秒精度"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = seconds % 60  # 保留小数部分
+    return f"{_time_prefix(hours, minutes)}{secs:.2f}秒"
+
+
+def _build_speaker_label(speaker_id) -> str:
+    """
+    speaker_id 可能是数字（0,1,2...）或字符串，转换为"说话人A "、"说话人B "等；
+    非数字的 speaker_id 按 0 处理，空值或无法转换时返回空字符串
+    """
+    if speaker_id is None or speaker_id == "":
+        return ""
+    try:
+        if isinstance(speaker_id, str) and speaker_id.isdigit():
+            speaker_num = int(speaker_id)
+        elif isinstance(speaker_id, (int, float)):
+            speaker_num = int(speaker_id)
+        else:
+            speaker_num = 0
+        # 转换为字母：0->A, 1->B, 2->C...
+        return f"说话人{chr(65 + speaker_num)} "
+    except (ValueError, TypeError, OverflowError):
+        return ""
+
+
+def _write_text(fp, text_file: Path, file_url: str, log_print) -> tuple:
+    """
+    从 fp 中增量解析句子，写入带时间戳（和说话人）的文本结果。
+    :return: (句子数, 预览文本)
+    """
+    sentences = _iter_sentences(fp)
+    first_sentence = next(sentences, None)
+
+    # 检查是否有说话人识别信息（看第一句是否有 speaker_id 字段）
+    has_speaker_info = False
+    if first_sentence is not None:
+        sentences = itertools.chain((first_sentence,), sentences)
+        if "speaker_id" in first_sentence:
+            has_speaker_info = True
+            log_print("[AliyunASR] 检测到说话人识别信息，开始逐句解析文本")
+        else:
+            log_print("[AliyunASR] 开始逐句解析文本（未检测到说话人信息）")
+
+    # 预览只取前 PREVIEW_CHARS 个字符左右，分段收集后一次拼接
+    preview_parts = []
+    preview_len = 0
+    sentence_count = 0
+    log_batch = []
+    # 先把所有行收集到列表中，最后一次性写入文件，避免逐句 write
+    lines = [
+        f"识别时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+        f"音频URL: {file_url}\n",
+    ]
+    if has_speaker_info:
+        lines.append("说话人识别: 已启用\n")
+    # 本次结果中 speaker_id -> 说话人标签，首次遇到时计算并缓存
+    speaker_labels = {}
+    lines.append("=" * 60 + "\n\n")
+    for s in sentences:
+        sentence_count += 1
+        if "text" not in s:
+            continue
+        begin_time = s.get("begin_time", 0) / 1000  # 毫秒转秒
+        end_time = s.get("end_time", 0) / 1000
+
+        begin_str = format_time(begin_time)
+        end_str = format_time(end_time)
+
+        # 如果有说话人信息，显示说话人标签
+        speaker_label = ""
+        if has_speaker_info:
+            speaker_id = s.get("speaker_id")
+            speaker_label = speaker_labels.get(speaker_id)
+            if speaker_label is None:
+                speaker_label = speaker_labels[speaker_id] = _build_speaker_label(speaker_id)
+
+        lines.append(f"[{begin_str} - {end_str}] {speaker_label}{s['text']}\n")
+
+        # 终端打印也显示说话人信息（攒够 LOG_BATCH 句再一起输出，减少 print 和日志回调次数）
+        log_batch.append(f"[AliyunASR] {begin_str}-{end_str} {speaker_label}{s['text'][:50]}...")
+        if len(log_batch) >= LOG_BATCH:
+            log_print("\n".join(log_batch))
+            log_batch.clear()
+
+        if preview_len < PREVIEW_CHARS:
+            chunk = speaker_label + s["text"] + " "
+            preview_parts.append(chunk)
+            preview_len += len(chunk)
+    if log_batch:
+        log_print("\n".join(log_batch))
+
+    text_file.write_text("".join(lines), encoding="utf-8")
+    return sentence_count, "".join(preview_parts).strip()
+
+
+def _save_result(result_url: str, json_file: Path, text_file: Path, file_url: str, log_print) -> tuple:
+    """
+    一次读取 transcription_url 的响应：原始字节直接写入 json_file，同时增量解析句子写入 text_file。
+    不在内存中保留完整 JSON，也不再重新序列化。
+    :return: (句子数, 预览文本)
+    """
+    with urlrequest.urlopen(result_url) as resp, json_file.open("wb", buffering=COPY_BUFSIZE) as jf:
+        tee = _TeeReader(resp, jf)
+        result = _write_text(tee, text_file, file_url, log_print)
+        # 解析器只读到第一个 transcript 就会停下，剩余部分也要写入 json_file
+        tee.drain()
+    return result
+
+
+def _cache_file(file_url: str) -> Path:
+    """file_url 对应的识别结果缓存文件（按 SHA-256 命名）"""
+    key = hashlib.sha256(file_url.encode("utf-8")).hexdigest()
+    return CACHE_DIR / f"{key}.json"
+
+
+def _save_cache(json_file: Path, cache_file: Path):
+    """把识别结果放入缓存目录：优先硬链接，跨文件系统时复制"""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = cache_file.with_suffix(".tmp")
+    try:
+        os.link(json_file, tmp)
+    except OSError:
+        shutil.copyfile(json_file, tmp)
+    tmp.replace(cache_file)
+
+
+def _build_record(file_url: str, json_file: Path, text_file: Path, preview: str, suffix: str = "") -> dict:
+    """生成历史记录并写入历史文件；suffix 用于同一批次多个结果时区分记录 ID"""
+    record_id = datetime.now().strftime("%Y%m%d%H%M%S") + suffix
+    record = {
+        "id": record_id,
+        "file_url": file_url,
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        # 在历史记录中保存相对于项目根目录的路径，便于展示和下载
+        "json_path": str(json_file.relative_to(PROJECT_ROOT)),
+        "text_path": str(text_file.relative_to(PROJECT_ROOT)),
+        "preview": preview,
+    }
+    _append_history(record)
+    return record
+
+
+def _finish(records: list, log_print, logs: list) -> dict:
+    """输出结束日志，返回成功结果（record 为第一条记录，records 为全部记录）"""
+    log_print(f"[AliyunASR] 第 6 步：历史记录已写入 {HISTORY_FILE.name}")
+    log_print("[AliyunASR] 本次识别流程完成 ✅")
+    log_print("=" * 60)
+    return {"success": True, "message": "识别成功", "record": records[0], "records": records, "logs": logs}
+
+
+async def _recognize_from_cache(file_url: str, log_print, logs: list):
+    """同一个 file_url 已识别过时直接复用缓存的结果 JSON，不再调用阿里云；未命中返回 None"""
+    if not file_url:
+        return None
+    cache_file = _cache_file(file_url)
+    if not cache_file.exists():
+        return None
+
+    log_print(f"[AliyunASR] 命中识别结果缓存，跳过阿里云识别: {cache_file.name}")
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    text_file = RESULT_DIR / f"识别文本_{timestamp}.txt"
+
+    def render():
+        with cache_file.open("rb") as f:
+            return _write_text(f, text_file, file_url, log_print)
+
+    try:
+        sentence_count, preview = await asyncio.to_thread(render)
+    except Exception as e:
+        # 缓存损坏时当作未命中，重新识别
+        log_print(f"[AliyunASR] 读取缓存失败，重新识别: {e}")
+        return None
+    log_print(f"[AliyunASR] 共解析到 {sentence_count} 句文本")
+    return _finish([_build_record(file_url, cache_file, text_file, preview)], log_print, logs)
+
+
+def _make_log_print(logs: list, log_callback=None):
+    """构造 log_print：同时输出到终端、收集到 logs，并可选择通过 log_callback 实时推送"""
     def log_print(*args, **kwargs):
-        """同时输出到终端、收集到日志列表，并可选择实时推送"""
         msg = " ".join(str(arg) for arg in args)
         print(*args, **kwargs)  # 输出到终端
         logs.append(msg)  # 收集到日志列表
@@ -107,20 +480,140 @@ def recognize_audio(file_url: str, log_callback=None) -> dict:
                 log_callback(msg)
             except Exception as e:
                 print(f"[AliyunASR] 日志回调失败: {e}")
+    return log_print
+
+
+def recognize_audio(file_url: str, log_callback=None) -> dict:
+    """
+    同步版本的识别入口，供尚未改为异步的调用方使用。
+    参数和返回值同 recognize_audio_async。
+    """
+    return asyncio.run(recognize_audio_async(file_url, log_callback=log_callback))
+
+
+def submit_recognition(file_url: str, log_callback=None) -> dict:
+    """
+    只提交识别任务，拿到 task_id 后立即返回；等待结果、下载和保存文件在后台线程中完成。
+    后台进度和最终记录通过 get_recognize_task(task_id) 查询。
+
+    Returns:
+        dict: {success: bool, message: str, task_id: str(optional), logs: list}
+    """
+    _prune_recognize_tasks()
+    logs = []
+    # 有新日志或任务结束时 set，推送接口等待它而不是定时轮询
+    changed = threading.Event()
+
+    def on_log(msg):
+        changed.set()
+        if log_callback:
+            log_callback(msg)
+
+    log_print = _make_log_print(logs, on_log)
+
+    # 命中缓存时直接生成记录，返回一个已完成的任务
+    cached = asyncio.run(_recognize_from_cache(file_url, log_print, logs))
+    if cached:
+        task_id = f"cache_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        _set_recognize_task(task_id, {"status": "completed", "message": cached["message"], "record": cached["record"], "logs": logs, "changed": changed, "finished_at": time.time()})
+        return {"success": True, "message": "命中识别结果缓存", "task_id": task_id, "logs": logs}
+
+    task_id, error = asyncio.run(_submit_async(file_url, log_print))
+    if error:
+        return {"success": False, "message": error, "logs": logs}
+
+    _set_recognize_task(task_id, {"status": "processing", "message": "识别中", "record": None, "logs": logs, "changed": changed, "finished_at": None})
+
+    def finalize_task():
+        try:
+            result = asyncio.run(_finalize_async(task_id, file_url, log_print, logs))
+        except Exception as e:
+            log_print(f"[AliyunASR] 后台处理识别结果异常: {e}")
+            result = {"success": False, "message": str(e)}
+        _set_recognize_task(task_id, {
+            "status": "completed" if result.get("success") else "error",
+            "message": result.get("message", ""),
+            "record": result.get("record"),
+            "logs": logs,
+            "changed": changed,
+            "finished_at": time.time(),
+        })
+        changed.set()
+
+    threading.Thread(target=finalize_task, daemon=True).start()
+    return {"success": True, "message": "识别任务已提交", "task_id": task_id, "logs": logs}
+
+
+def get_recognize_task(task_id: str):
+    """
+    查询 submit_recognition 提交的任务：{status: processing|completed|error, message, record, logs, changed, finished_at}，不存在返回 None
+    changed 为 threading.Event，有新日志或任务结束时 set
+    """
+    return RECOGNIZE_TASKS.get(task_id)
+
+
+def _set_recognize_task(task_id: str, task: dict):
+    """写入任务状态（与清理、移除任务共用 _TASKS_LOCK）"""
+    with _TASKS_LOCK:
+        RECOGNIZE_TASKS[task_id] = task
+
+
+def pop_recognize_task(task_id: str):
+    """结果已推送给前端后移除任务"""
+    with _TASKS_LOCK:
+        RECOGNIZE_TASKS.pop(task_id, None)
+
+
+def _prune_recognize_tasks():
+    """清理结束超过 RECOGNIZE_TASK_TTL 秒仍没有被取走结果的任务"""
+    expire = time.time() - RECOGNIZE_TASK_TTL
+    with _TASKS_LOCK:
+        for task_id, task in list(RECOGNIZE_TASKS.items()):
+            if task["finished_at"] is not None and task["finished_at"] < expire:
+                del RECOGNIZE_TASKS[task_id]
+
+
+async def recognize_audio_async(file_url: str, log_callback=None) -> dict:
+    """
+    调用阿里云 ASR 识别给定的音频 URL，并保存结果和历史记录。
+    提交任务、轮询状态和下载结果都不会阻塞事件循环，单个事件循环可同时处理多个识别任务。
     
+    Args:
+        file_url: 音频文件的 URL
+        log_callback: 可选的日志回调函数，用于实时推送日志。函数签名: log_callback(message: str)
+    
+    Returns:
+        dict: {success: bool, message: str, record: dict(optional), logs: list(optional)}
+    """
+    # 日志收集列表
+    logs = []
+    log_print = _make_log_print(logs, log_callback)
+
+    cached = await _recognize_from_cache(file_url, log_print, logs)
+    if cached:
+        return cached
+
+    task_id, error = await _submit_async(file_url, log_print)
+    if error:
+        return {"success": False, "message": error, "logs": logs}
+    return await _finalize_async(task_id, file_url, log_print, logs)
+
+
+async def _submit_async(file_url: str, log_print) -> tuple:
+    """提交识别任务，返回 (task_id, None)；失败时返回 (None, 错误信息)"""
     log_print("=" * 60)
     log_print("[AliyunASR] 即将开始一次识别任务")
     log_print(f"[AliyunASR] 输入音频 URL: {file_url}")
 
     if not file_url:
         log_print("[AliyunASR] 错误：音频 URL 为空")
-        return {"success": False, "message": "音频 URL 不能为空", "logs": logs}
+        return None, "音频 URL 不能为空"
 
     try:
         _init_api_key()
     except Exception as e:
         log_print(f"[AliyunASR] 初始化 API Key 失败: {e}")
-        return {"success": False, "message": str(e), "logs": logs}
+        return None, str(e)
 
     log_print("[AliyunASR] 第 1 步：开始提交阿里云语音识别任务...")
 
@@ -128,20 +621,27 @@ def recognize_audio(file_url: str, log_callback=None) -> dict:
     try:
         log_print("[AliyunASR] 调用 Transcription.async_call()...")
         log_print("[AliyunASR] 启用说话人识别功能 (diarization_enabled=True)")
-        task_response = Transcription.async_call(
+        task_response = await asyncio.to_thread(
+            Transcription.async_call,
             model="paraformer-v2",
             file_urls=[file_url],
             language_hints=["zh"],
             diarization_enabled=True,  # 启用说话人识别
         )
+        task_id = task_response.output.task_id
     except Exception as e:
         log_print(f"[AliyunASR] async_call 调用失败: {e}")
-        return {"success": False, "message": f"提交识别任务失败: {e}", "logs": logs}
+        return None, f"提交识别任务失败: {e}"
+
+    log_print(f"[AliyunASR] 任务已提交，Task ID: {task_id}")
+    return task_id, None
+
 
+async def _finalize_async(task_id: str, file_url: str, log_print, logs: list) -> dict:
+    """等待已提交的任务完成，下载并保存结果、写入历史记录"""
     try:
-        log_print(f"[AliyunASR] 任务已提交，Task ID: {task_response.output.task_id}")
         log_print("[AliyunASR] 第 2 步：开始等待阿里云返回识别结果...")
-        transcription_response = Transcription.wait(task=task_response.output.task_id)
+        transcription_response = await _wait_transcription(task_id)
     except Exception as e:
         log_print(f"[AliyunASR] 等待识别结果失败: {e}")
         return {"success": False, "message": f"等待识别结果失败: {e}", "logs": logs}
@@ -160,8 +660,27 @@ def recognize_audio(file_url: str, log_callback=None) -> dict:
         log_print("[AliyunASR] 返回结果中 results 为空")
         return {"success": False, "message": "未返回任何识别结果", "logs": logs}
 
-    # 目前只处理第一个文件
-    transcription = all_results[0]
+    # 多个文件的结果并发下载、解析和保存，总耗时取决于最慢的一个
+    suffixes = [f"_{i}" for i in range(1, len(all_results) + 1)] if len(all_results) > 1 else [""]
+    results = await asyncio.gather(*(
+        _process_result(transcription, file_url, suffix, log_print)
+        for transcription, suffix in zip(all_results, suffixes)
+    ))
+
+    records = [r for r in results if isinstance(r, dict)]
+    if not records:
+        # 全部失败时返回第一个错误信息
+        return {"success": False, "message": results[0], "logs": logs}
+    return _finish(records, log_print, logs)
+
+
+async def _process_result(transcription: dict, file_url: str, suffix: str, log_print):
+    """
+    处理单个文件的识别结果：下载并保存 JSON 和文本、写入缓存和历史记录。
+    :return: 成功时返回历史记录 dict，失败时返回错误信息字符串
+    """
+    # 批量识别时每个结果对应自己的 file_url
+    file_url = transcription.get("file_url") or file_url
     sub_status = transcription.get("subtask_status")
     log_print(f"[AliyunASR] 子任务状态 subtask_status = {sub_status}")
     if sub_status != "SUCCEEDED":
@@ -170,141 +689,30 @@ def recognize_audio(file_url: str, log_callback=None) -> dict:
             log_print(json.dumps(transcription, ensure_ascii=False, indent=2))
         except Exception:
             log_print(str(transcription))
-        return {
-            "success": False,
-            "message": f"识别失败: {transcription.get('subtask_status', 'Unknown')}",
-            "logs": logs,
-        }
-
-    try:
-        result_url = transcription["transcription_url"]
-        log_print(f"[AliyunASR] 第 4 步：开始通过 transcription_url 下载完整结果: {result_url}")
-        result = json.loads(urlrequest.urlopen(result_url).read().decode("utf8"))
-    except Exception as e:
-        log_print(f"[AliyunASR] 下载或解析 transcription_url 结果失败: {e}")
-        return {"success": False, "message": f"下载或解析识别结果失败: {e}", "logs": logs}
+        return f"识别失败: {transcription.get('subtask_status', 'Unknown')}"
 
     # 保存结果文件（统一放在 results 子目录下）
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S") + suffix
     RESULT_DIR.mkdir(parents=True, exist_ok=True)
     json_file = RESULT_DIR / f"识别结果_{timestamp}.json"
     text_file = RESULT_DIR / f"识别文本_{timestamp}.txt"
 
     try:
-        log_print("[AliyunASR] 第 5 步：保存 JSON 和文本结果到 aliyun 目录")
-        with json_file.open("w", encoding="utf-8") as f:
-            json.dump(result, f, indent=4, ensure_ascii=False)
+        result_url = transcription["transcription_url"]
+        log_print(f"[AliyunASR] 第 4 步：开始通过 transcription_url 下载完整结果: {result_url}")
+        log_print("[AliyunASR] 第 5 步：边下载边解析，保存 JSON 和文本结果到 aliyun 目录")
+        # 下载和逐句解析都是阻塞 IO，放到线程中执行，不阻塞事件循环
+        sentence_count, preview = await asyncio.to_thread(
+            _save_result, result_url, json_file, text_file, file_url, log_print
+        )
     except Exception as e:
-        log_print(f"保存 JSON 结果失败: {e}")
-
-    # 提取文本
-    sentences = []
-    if "transcripts" in result and result.get("transcripts"):
-        sentences = result["transcripts"][0].get("sentences", [])
-    elif "sentences" in result:
-        sentences = result.get("sentences", [])
-
-    # 检查是否有说话人识别信息
-    has_speaker_info = False
-    if sentences:
-        # 检查第一句是否有 speaker_id 字段
-        if sentences and "speaker_id" in sentences[0]:
-            has_speaker_info = True
-            log_print(f"[AliyunASR] 检测到说话人识别信息，共解析到 {len(sentences)} 句文本")
-        else:
-            log_print(f"[AliyunASR] 共解析到 {len(sentences)} 句文本（未检测到说话人信息）")
-        for s in sentences:
-            if "text" in s:
-                pass
+        log_print(f"[AliyunASR] 下载或解析识别结果失败: {e}")
+        return f"下载或解析识别结果失败: {e}"
+    log_print(f"[AliyunASR] 共解析到 {sentence_count} 句文本")
 
-    preview = ""
     try:
-        with text_file.open("w", encoding="utf-8") as f:
-            f.write(f"识别时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"音频URL: {file_url}\n")
-            if has_speaker_info:
-                f.write("说话人识别: 已启用\n")
-            f.write("=" * 60 + "\n\n")
-            for s in sentences:
-                if "text" not in s:
-                    continue
-                begin_time = s.get("begin_time", 0) / 1000  # 毫秒转秒
-                end_time = s.get("end_time", 0) / 1000
-                
-                # 格式化为"X小时X分X.XX秒"，保留毫秒精度
-                def format_time(seconds):
-                    hours = int(seconds // 3600)
-                    minutes = int((seconds % 3600) // 60)
-                    secs = seconds % 60  # 保留小数部分
-                    parts = []
-                    if hours > 0:
-                        parts.append(f"{hours}小时")
-                    if minutes > 0 or hours > 0:
-                        parts.append(f"{minutes}分")
-                    # 保留2位小数（毫秒精度）
-                    parts.append(f"{secs:.2f}秒")
-                    return "".join(parts)
-                
-                begin_str = format_time(begin_time)
-                end_str = format_time(end_time)
-                
-                # 如果有说话人信息，显示说话人标签
-                speaker_label = ""
-                if has_speaker_info:
-                    speaker_id = s.get("speaker_id")
-                    if speaker_id is not None and speaker_id != "":
-                        # speaker_id 可能是数字（0,1,2...）或字符串，转换为"说话人A"、"说话人B"等
-                        try:
-                            # 尝试转换为整数
-                            if isinstance(speaker_id, str) and speaker_id.isdigit():
-                                speaker_num = int(speaker_id)
-                            elif isinstance(speaker_id, (int, float)):
-                                speaker_num = int(speaker_id)
-                            else:
-                                # 如果不是数字，使用0作为默认值
-                                speaker_num = 0
-                            # 转换为字母：0->A, 1->B, 2->C...
-                            speaker_label = f"说话人{chr(65 + speaker_num)} "  # A=65, B=66, ...
-                        except (ValueError, TypeError):
-                            # 如果转换失败，不显示说话人标签
-                            speaker_label = ""
-                
-                line = f"[{begin_str} - {end_str}] {speaker_label}{s['text']}\n"
-                f.write(line)
-                
-                # 终端打印也显示说话人信息
-                if has_speaker_info and speaker_label:
-                    log_print(f"[AliyunASR] {begin_str}-{end_str} {speaker_label}{s['text'][:50]}...")
-                else:
-                    log_print(f"[AliyunASR] {begin_str}-{end_str} {s['text'][:50]}...")
-                
-                if len(preview) < 300:
-                    preview += (speaker_label + s["text"] + " " if speaker_label else s["text"] + " ")
+        await asyncio.to_thread(_save_cache, json_file, _cache_file(file_url))
     except Exception as e:
-        log_print(f"[AliyunASR] 保存文本结果失败: {e}")
-
-    # 生成历史记录
-    record_id = datetime.now().strftime("%Y%m%d%H%M%S")
-    record = {
-        "id": record_id,
-        "file_url": file_url,
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        # 在历史记录中保存相对于项目根目录的路径，便于展示和下载
-        "json_path": str(json_file.relative_to(PROJECT_ROOT)),
-        "text_path": str(text_file.relative_to(PROJECT_ROOT)),
-        "preview": preview.strip(),
-    }
-
-    history = _load_history(limit=10000)
-    history.insert(0, record)
-    if len(history) > 200:
-        history = history[:200]
-    _save_history(history)
-
-    log_print("[AliyunASR] 第 6 步：历史记录已写入 aliyun_history.json")
-    log_print("[AliyunASR] 本次识别流程完成 ✅")
-    log_print("=" * 60)
-
-    return {"success": True, "message": "识别成功", "record": record, "logs": logs}
-
+        log_print(f"[AliyunASR] 写入识别结果缓存失败: {e}")
 
+    return _build_record(file_url, json_file, text_file, preview, suffix)
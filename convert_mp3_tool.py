@@ -1,22 +1,34 @@
+import heapq
 import os
+import shutil
 import time
+from collections import namedtuple
 from typing import Tuple, List, Dict
-import threading
 
 from stslib import cfg, tool
 
 
-# 转换任务进度字典 {task_id: {"progress": 0-100, "status": "processing|completed|error", "message": ""}}
-CONVERT_PROGRESS = {}
-CONVERT_LOCK = threading.Lock()
+# 单个任务的进度（不可变），progress: 0-100, status: processing|completed|error
+Progress = namedtuple("Progress", "progress status message")
+UNKNOWN_PROGRESS = Progress(0, "unknown", "任务不存在")
 
+# 转换任务进度字典 {task_id: Progress}
+# 每次更新都是整体替换一个不可变的 Progress，单次 dict 赋值在 CPython 中是原子的，读写都不需要加锁
+CONVERT_PROGRESS: Dict[str, Progress] = {}
 
-def convert_to_mp3(src_file: str, task_id: str = None) -> Tuple[str, str]:
+
+def set_convert_progress(task_id: str, progress: int, status: str, message: str):
+    """更新转换进度"""
+    CONVERT_PROGRESS[task_id] = Progress(progress, status, message)
+
+
+def convert_to_mp3(src_file: str, task_id: str = None, quality: int = 4) -> Tuple[str, str]:
     """
     将音频文件转换为 MP3 格式
 
     :param src_file: 源音频文件绝对路径
     :param task_id: 任务ID，用于跟踪进度
+    :param quality: libmp3lame VBR 质量（0-9，0最高质量），默认 4 兼顾速度和音质
     :return: (输出文件绝对路径, 可下载的 URL)
     """
     if not os.path.exists(src_file):
@@ -24,12 +36,7 @@ def convert_to_mp3(src_file: str, task_id: str = None) -> Tuple[str, str]:
 
     # 更新进度：开始转换
     if task_id:
-        with CONVERT_LOCK:
-            CONVERT_PROGRESS[task_id] = {
-                "progress": 10,
-                "status": "processing",
-                "message": "正在准备转换..."
-            }
+        set_convert_progress(task_id, 10, "processing", "正在准备转换...")
 
     # 转换文件保存目录：static/convert
     convert_dir = os.path.join(cfg.STATIC_DIR, "convert")
@@ -46,76 +53,69 @@ def convert_to_mp3(src_file: str, task_id: str = None) -> Tuple[str, str]:
         out_name = f"{base_name}_{timestamp}.mp3"
         out_path = os.path.join(convert_dir, out_name)
 
+    # 源文件已经是 MP3：不需要重新编码，直接硬链接（跨文件系统时复制）到输出目录
+    if os.path.splitext(src_file)[1].lower() == ".mp3":
+        print(f"[convert_mp3_tool] 源文件已是 MP3，跳过转码: {src_file}")
+        try:
+            os.link(src_file, out_path)
+        except OSError:
+            shutil.copyfile(src_file, out_path)
+        if task_id:
+            set_convert_progress(task_id, 100, "completed", "转换完成")
+        return out_path, f"/static/convert/{out_name}"
+
     if task_id:
-        with CONVERT_LOCK:
-            CONVERT_PROGRESS[task_id] = {
-                "progress": 30,
-                "status": "processing",
-                "message": "正在转换音频格式..."
-            }
+        set_convert_progress(task_id, 30, "processing", "正在转换音频格式...")
 
     # 使用 ffmpeg 转换为 MP3
     # 参数说明：
+    # -loglevel error: 只输出错误信息，减少 ffmpeg 输出
+    # -threads 0: 让 ffmpeg 自动选择解码/重采样线程数
     # -i: 输入文件
+    # -map 0:a:0: 只处理第一条音轨，跳过视频/字幕等流
     # -codec:a libmp3lame: 使用 MP3 编码器
-    # -q:a 2: 音频质量（0-9，0最高质量，2是高质量）
+    # -q:a: VBR 音频质量（0-9，0最高质量），默认 4，需要高质量存档时可传 2
+    # -compression_level 7: LAME 编码算法质量档位（0最慢最好，9最快），7 对应 lame -f 快速模式
     # -y: 覆盖输出文件（虽然我们已经检查了，但加上更安全）
     params = [
+        "-loglevel",
+        "error",
+        "-threads",
+        "0",
         "-i",
         src_file,
+        "-map",
+        "0:a:0",
         "-codec:a",
         "libmp3lame",
         "-q:a",
-        "2",  # 高质量 MP3
+        str(quality),
+        "-compression_level",
+        "7",
         "-y",
         out_path,
     ]
 
     if task_id:
-        with CONVERT_LOCK:
-            CONVERT_PROGRESS[task_id] = {
-                "progress": 50,
-                "status": "processing",
-                "message": "正在编码 MP3..."
-            }
+        set_convert_progress(task_id, 50, "processing", "正在编码 MP3...")
 
     rs = tool.runffmpeg(params)
     if rs != "ok":
         if task_id:
-            with CONVERT_LOCK:
-                CONVERT_PROGRESS[task_id] = {
-                    "progress": 0,
-                    "status": "error",
-                    "message": f"转换失败: {rs}"
-                }
+            set_convert_progress(task_id, 0, "error", f"转换失败: {rs}")
         raise RuntimeError(f"转换音频失败: {rs}")
 
     if task_id:
-        with CONVERT_LOCK:
-            CONVERT_PROGRESS[task_id] = {
-                "progress": 90,
-                "status": "processing",
-                "message": "正在完成转换..."
-            }
+        set_convert_progress(task_id, 90, "processing", "正在完成转换...")
 
     # 验证输出文件是否存在
     if not os.path.exists(out_path):
         if task_id:
-            with CONVERT_LOCK:
-                CONVERT_PROGRESS[task_id] = {
-                    "progress": 0,
-                    "status": "error",
-                    "message": "转换失败：输出文件未生成"
-                }
+            set_convert_progress(task_id, 0, "error", "转换失败：输出文件未生成")
         raise RuntimeError("转换失败：输出文件未生成")
 
     if task_id:
-        with CONVERT_LOCK:
-            CONVERT_PROGRESS[task_id] = {
-                "progress": 100,
-                "status": "completed",
-                "message": "转换完成"
-            }
+        set_convert_progress(task_id, 100, "completed", "转换完成")
 
     # Flask 的 static 目录映射为 /static
     url = f"/static/convert/{out_name}"
@@ -129,12 +129,7 @@ def get_convert_progress(task_id: str) -> Dict:
     :param task_id: 任务ID
     :return: 进度信息字典
     """
-    with CONVERT_LOCK:
-        return CONVERT_PROGRESS.get(task_id, {
-            "progress": 0,
-            "status": "unknown",
-            "message": "任务不存在"
-        })
+    return CONVERT_PROGRESS.get(task_id, UNKNOWN_PROGRESS)._asdict()
 
 
 def clear_convert_progress(task_id: str):
@@ -143,9 +138,47 @@ def clear_convert_progress(task_id: str):
 
     :param task_id: 任务ID
     """
-    with CONVERT_LOCK:
-        if task_id in CONVERT_PROGRESS:
-            del CONVERT_PROGRESS[task_id]
+    CONVERT_PROGRESS.pop(task_id, None)
+
+
+def _iter_convert_entries(convert_dir: str):
+    """
+    遍历转换目录中的 .mp3 文件，产出 (文件名, stat)
+    os.scandir 返回的 DirEntry 自带文件类型和 stat 缓存，避免对每个文件再单独 stat
+    """
+    with os.scandir(convert_dir) as it:
+        for entry in it:
+            # 只处理 .mp3 文件
+            if entry.is_file() and entry.name.lower().endswith('.mp3'):
+                yield entry.name, entry.stat()
+
+
+def _build_convert_item(name: str, stat: os.stat_result) -> Dict:
+    """根据文件名和 stat 构造一条转换记录（文件系统回退模式）"""
+    mtime = stat.st_mtime
+    size = stat.st_size
+
+    # 获取原始文件名（去除时间戳后缀）
+    base_name = os.path.splitext(name)[0]
+    # 如果文件名包含时间戳（格式：base_timestamp），提取原始名称
+    if '_' in base_name:
+        parts = base_name.rsplit('_', 1)
+        if len(parts) == 2 and parts[1].isdigit():
+            original_name = parts[0]
+        else:
+            original_name = base_name
+    else:
+        original_name = base_name
+
+    return {
+        "file_name": name,
+        "original_name": original_name,  # 原始文件名（不含扩展名）
+        "url": f"/static/convert/{name}",
+        "size": size,
+        "size_mb": round(size / (1024 * 1024), 2),  # 转换为 MB
+        "mtime": mtime,
+        "mtime_str": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(mtime)),
+    }
 
 
 def list_convert_history(limit: int = 50) -> List[Dict]:
@@ -229,10 +262,8 @@ def list_convert_history(limit: int = 50) -> List[Dict]:
                     "mtime_str": mtime_str,
                 })
         
-        # 按操作时间降序排序（最新的在前）
-        items.sort(key=lambda x: x.get("mtime_str", ""), reverse=True)
-        
-        return items[:limit]
+        # 按操作时间降序取前 limit 条（最新的在前）
+        return heapq.nlargest(limit, items, key=lambda x: x.get("mtime_str", ""))
     except ImportError:
         print("[convert_mp3_tool] 警告：无法导入数据库模块，回退到文件系统")
     except Exception as e:
@@ -243,50 +274,13 @@ def list_convert_history(limit: int = 50) -> List[Dict]:
     if not os.path.exists(convert_dir):
         return []
 
-    items: List[Dict] = []
-    for name in os.listdir(convert_dir):
-        path = os.path.join(convert_dir, name)
-        if not os.path.isfile(path):
-            continue
-
-        # 只处理 .mp3 文件
-        if not name.lower().endswith('.mp3'):
-            continue
-
-        stat = os.stat(path)
-        mtime = stat.st_mtime
-        size = stat.st_size
-
-        # 获取原始文件名（去除时间戳后缀）
-        base_name = os.path.splitext(name)[0]
-        # 如果文件名包含时间戳（格式：base_timestamp），提取原始名称
-        if '_' in base_name:
-            parts = base_name.rsplit('_', 1)
-            if len(parts) == 2 and parts[1].isdigit():
-                original_name = parts[0]
-            else:
-                original_name = base_name
-        else:
-            original_name = base_name
-
-        items.append(
-            {
-                "file_name": name,
-                "original_name": original_name,  # 原始文件名（不含扩展名）
-                "url": f"/static/convert/{name}",
-                "size": size,
-                "size_mb": round(size / (1024 * 1024), 2),  # 转换为 MB
-                "mtime": mtime,
-                "mtime_str": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(mtime)),
-            }
-        )
-
-    # 按操作时间降序排序（最新的在前）
-    items.sort(key=lambda x: x["mtime"], reverse=True)
+    # 只保留最新的 limit 个文件（O(N log limit)），再为它们构造记录
+    latest = heapq.nlargest(limit, _iter_convert_entries(convert_dir), key=lambda e: e[1].st_mtime)
+    items = [_build_convert_item(name, stat) for name, stat in latest]
 
     # 添加ID字段（从1开始，按时间倒序）
-    for idx, item in enumerate(items[:limit], start=1):
+    for idx, item in enumerate(items, start=1):
         item["id"] = idx
 
-    return items[:limit]
+    return items
 
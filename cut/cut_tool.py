@@ -1,31 +1,67 @@
+import functools
+import heapq
 import os
+import re
 import time
 import json
 from typing import Tuple, List, Dict
 
 from stslib import cfg, tool
 
+# 时:分:秒，分钟和秒限定 0-59，同时完成格式校验和字段提取
+_TIME_RE = re.compile(r"^\s*(\d+):([0-5]?\d):([0-5]?\d)\s*$", re.ASCII)
 
+
+@functools.lru_cache(maxsize=4096)
 def _parse_time_str(time_str: str) -> int:
     """
-    将 00:00:00 格式的时间转换为秒数
+    将 00:00:00 格式的时间转换为秒数（界面反复选取的时间点相同，结果缓存复用；格式错误不会被缓存）
     """
-    time_str = time_str.strip()
-    parts = time_str.split(":")
-    if len(parts) != 3:
-        raise ValueError("时间格式必须为 00:00:00（时:分:秒）")
-
-    try:
-        hours = int(parts[0])
-        minutes = int(parts[1])
-        seconds = int(parts[2])
-    except ValueError:
-        raise ValueError("时间必须是数字，比如 00:01:30")
+    m = _TIME_RE.match(time_str)
+    if not m:
+        raise ValueError("时间格式必须为 00:00:00（时:分:秒），分钟和秒需在 0-59 之间")
+    hours, minutes, seconds = map(int, m.groups())
+    return hours * 3600 + minutes * 60 + seconds
 
-    if minutes < 0 or minutes >= 60 or seconds < 0 or seconds >= 60 or hours < 0:
-        raise ValueError("时间不合法，请检查小时/分钟/秒")
 
-    return hours * 3600 + minutes * 60 + seconds
+def _cut_with_av(src_wav: str, out_path: str, start_sec: int, end_sec: int):
+    """
+    用 PyAV 把 [start_sec, end_sec) 区间的音频包原样复制到 out_path（相当于 ffmpeg -acodec copy）
+    """
+    import av
+
+    with av.open(src_wav) as ic:
+        in_stream = ic.streams.audio[0]
+        time_base = in_stream.time_base
+        with av.open(out_path, "w") as oc:
+            # PyAV 新版本使用 add_stream_from_template，旧版本使用 add_stream(template=...)
+            add_from_template = getattr(oc, "add_stream_from_template", None)
+            if add_from_template:
+                out_stream = add_from_template(in_stream)
+            else:
+                out_stream = oc.add_stream(template=in_stream)
+
+            ic.seek(int(start_sec * av.time_base))
+            offset = None
+            for packet in ic.demux(in_stream):
+                if packet.pts is None:
+                    continue
+                packet_time = packet.pts * time_base
+                if packet_time < start_sec:
+                    continue
+                if packet_time >= end_sec:
+                    break
+                # 输出时间戳从 0 开始
+                if offset is None:
+                    offset = packet.pts
+                packet.pts -= offset
+                if packet.dts is not None:
+                    packet.dts -= offset
+                packet.stream = out_stream
+                oc.mux(packet)
+
+    if offset is None:
+        raise RuntimeError("指定时间段内没有音频数据")
 
 
 def cut_audio_segment(src_wav: str, start_time: str, end_time: str) -> Tuple[str, str]:
@@ -60,30 +96,17 @@ def cut_audio_segment(src_wav: str, start_time: str, end_time: str) -> Tuple[str
     out_name = f"{base}_{int(start_sec):06d}_{int(end_sec):06d}{original_ext}"
     out_path = os.path.join(cut_dir, out_name)
 
-    # 使用 ffmpeg 截取音频，尝试保持原编码（copy），如果失败则重新编码但保持格式
-    params = [
-        "-ss",
-        str(start_sec),
-        "-i",
-        src_wav,
-        "-t",
-        str(duration),
-        "-acodec",
-        "copy",
-        out_path,
-    ]
-    rs = tool.runffmpeg(params)
-    
-    # 如果 copy 失败（可能因为时间点不在关键帧），尝试重新编码但保持原始格式
-    if rs != "ok":
-        # 移除输出文件（如果已创建）
+    # 优先用 PyAV 在进程内直接 remux（不解码、不启动 ffmpeg 进程），失败时回退到 ffmpeg 命令行
+    try:
+        _cut_with_av(src_wav, out_path, start_sec, end_sec)
+    except Exception as e:
+        print(f"[cut_tool] PyAV 截取失败，改用 ffmpeg: {e}")
         if os.path.exists(out_path):
             try:
                 os.remove(out_path)
-            except:
+            except OSError:
                 pass
-        
-        # 重新编码，但保持原始容器格式
+        # 使用 ffmpeg 截取音频，尝试保持原编码（copy），如果失败则重新编码但保持格式
         params = [
             "-ss",
             str(start_sec),
@@ -91,22 +114,47 @@ def cut_audio_segment(src_wav: str, start_time: str, end_time: str) -> Tuple[str
             src_wav,
             "-t",
             str(duration),
-            "-c",
-            "copy",  # 尝试复制所有流
+            "-acodec",
+            "copy",
             out_path,
         ]
         rs = tool.runffmpeg(params)
+        
+        # 如果 copy 失败（可能因为时间点不在关键帧），尝试重新编码但保持原始格式
         if rs != "ok":
-            raise RuntimeError(f"截取音频失败: {rs}")
+            # 移除输出文件（如果已创建）
+            if os.path.exists(out_path):
+                try:
+                    os.remove(out_path)
+                except OSError:
+                    pass
+        
+            # 重新编码，但保持原始容器格式
+            params = [
+                "-ss",
+                str(start_sec),
+                "-i",
+                src_wav,
+                "-t",
+                str(duration),
+                "-c",
+                "copy",  # 尝试复制所有流
+                out_path,
+            ]
+            rs = tool.runffmpeg(params)
+            if rs != "ok":
+                raise RuntimeError(f"截取音频失败: {rs}")
 
     # Flask 的 static 目录映射为 /static
     url = f"/static/cut/{out_name}"
     return out_path, url
 
 
+@functools.lru_cache(maxsize=4096)
 def _seconds_to_time_str(seconds: int) -> str:
     """
     将秒数转换为 00:00:00 格式
+    列表接口中同样的秒数（00:00:00、00:05:00 等）大量重复，结果缓存复用
     """
     hours = seconds // 3600
     minutes = (seconds % 3600) // 60
@@ -114,6 +162,64 @@ def _seconds_to_time_str(seconds: int) -> str:
     return f"{hours:02d}:{minutes:02d}:{secs:02d}"
 
 
+def _iter_cut_entries(cut_dir: str):
+    """
+    遍历截取目录中的音频文件，产出 (文件名, stat)
+    os.scandir 返回的 DirEntry 自带文件类型和 stat 缓存，避免对每个文件再单独 stat
+    """
+    with os.scandir(cut_dir) as it:
+        for entry in it:
+            name = entry.name
+            # 过滤掉隐藏文件和 JSON 配置文件
+            if name.startswith('.') or name.endswith('.json'):
+                continue
+            if not entry.is_file():
+                continue
+            yield name, entry.stat()
+
+
+def _build_cut_item(name: str, stat: os.stat_result) -> Dict:
+    """根据文件名和 stat 构造一条截取记录"""
+    mtime = stat.st_mtime
+    
+    # 从文件名解析开始和结束时间
+    # 文件名格式：base_000300_000600.wav
+    base_name, ext = os.path.splitext(name)
+    parts = base_name.rsplit('_', 2)
+    
+    start_time_str = "00:00:00"
+    end_time_str = "00:00:00"
+    duration_str = "00:00:00"
+    original_name = name  # 默认使用完整文件名
+    
+    if len(parts) >= 3:
+        try:
+            start_sec = int(parts[-2])
+            end_sec = int(parts[-1])
+            start_time_str = _seconds_to_time_str(start_sec)
+            end_time_str = _seconds_to_time_str(end_sec)
+            duration_sec = end_sec - start_sec
+            duration_str = _seconds_to_time_str(duration_sec)
+            # 提取原始文件名（去掉时间戳部分）
+            original_name = '_'.join(parts[:-2]) + ext if len(parts) > 2 else name
+        except (ValueError, IndexError):
+            pass
+    
+    return {
+        "file_name": name,
+        "original_name": original_name,  # 原始文件名（用于分组）
+        "url": f"/static/cut/{name}",
+        "size": stat.st_size,
+        "size_mb": round(stat.st_size / (1024 * 1024), 2),  # 转换为 MB
+        "mtime": mtime,
+        "mtime_str": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(mtime)),
+        "start_time": start_time_str,
+        "end_time": end_time_str,
+        "time_range": f"{start_time_str}-{end_time_str}",
+        "duration": duration_str,
+    }
+
+
 def list_cut_history(limit: int = 50) -> List[Dict]:
     """
     获取历史截取记录（按时间倒序）
@@ -123,64 +229,15 @@ def list_cut_history(limit: int = 50) -> List[Dict]:
     if not os.path.exists(cut_dir):
         return []
 
-    items: List[Dict] = []
-    for name in os.listdir(cut_dir):
-        # 过滤掉隐藏文件和 JSON 配置文件
-        if name.startswith('.') or name.endswith('.json'):
-            continue
-        path = os.path.join(cut_dir, name)
-        if not os.path.isfile(path):
-            continue
-        stat = os.stat(path)
-        mtime = stat.st_mtime
-        
-        # 从文件名解析开始和结束时间
-        # 文件名格式：base_000300_000600.wav
-        base_name, ext = os.path.splitext(name)
-        parts = base_name.rsplit('_', 2)
-        
-        start_time_str = "00:00:00"
-        end_time_str = "00:00:00"
-        duration_str = "00:00:00"
-        original_name = name  # 默认使用完整文件名
-        
-        if len(parts) >= 3:
-            try:
-                start_sec = int(parts[-2])
-                end_sec = int(parts[-1])
-                start_time_str = _seconds_to_time_str(start_sec)
-                end_time_str = _seconds_to_time_str(end_sec)
-                duration_sec = end_sec - start_sec
-                duration_str = _seconds_to_time_str(duration_sec)
-                # 提取原始文件名（去掉时间戳部分）
-                original_name = '_'.join(parts[:-2]) + ext if len(parts) > 2 else name
-            except (ValueError, IndexError):
-                pass
-        
-        items.append(
-            {
-                "file_name": name,
-                "original_name": original_name,  # 原始文件名（用于分组）
-                "url": f"/static/cut/{name}",
-                "size": stat.st_size,
-                "size_mb": round(stat.st_size / (1024 * 1024), 2),  # 转换为 MB
-                "mtime": mtime,
-                "mtime_str": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(mtime)),
-                "start_time": start_time_str,
-                "end_time": end_time_str,
-                "time_range": f"{start_time_str}-{end_time_str}",
-                "duration": duration_str,
-            }
-        )
-
-    # 按操作时间降序排序（最新的在前）
-    items.sort(key=lambda x: x["mtime"], reverse=True)
+    # 只保留最新的 limit 个文件（O(N log limit)），再为它们构造记录
+    latest = heapq.nlargest(limit, _iter_cut_entries(cut_dir), key=lambda e: e[1].st_mtime)
+    items = [_build_cut_item(name, stat) for name, stat in latest]
     
     # 添加ID字段（从1开始，按时间倒序）
-    for idx, item in enumerate(items[:limit], start=1):
+    for idx, item in enumerate(items, start=1):
         item["id"] = idx
     
-    return items[:limit]
+    return items
 
 
 def list_cut_history_grouped(limit: int = 50) -> List[Dict]:
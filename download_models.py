@@ -26,13 +26,14 @@ os.environ.setdefault('KMP_AFFINITY', 'disabled')
 os.environ.setdefault('KMP_SHARED_MEMORY', 'disabled')
 os.environ.setdefault('OMP_SHARED_MEMORY', 'disabled')
 
-from dotenv import load_dotenv
-import stslib
-from stslib import cfg
-from faster_whisper import WhisperModel
+# Hugging Face 下载加速：安装了 hf_transfer 时启用多连接下载，Xet 存储使用高性能模式
+import importlib.util
+if importlib.util.find_spec('hf_transfer'):
+    os.environ.setdefault('HF_HUB_ENABLE_HF_TRANSFER', '1')
+os.environ.setdefault('HF_XET_HIGH_PERFORMANCE', '1')
 
-# 加载 .env 文件
-load_dotenv()
+import gc
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 可用的 Whisper 模型列表（按大小和效果排序）
 # 推荐下载：base, small, medium, large-v3（根据需求选择）
@@ -51,54 +52,102 @@ WHISPER_MODELS = [
     "large",          # 大模型（旧版）
 ]
 
+# 同时下载的模型数
+DOWNLOAD_WORKERS = 4
+# 单个模型内部并发下载的文件数
+FILE_WORKERS = 8
+# faster-whisper 加载模型需要的文件（与 faster_whisper.utils.download_model 一致）
+MODEL_FILE_PATTERNS = [
+    "config.json",
+    "preprocessor_config.json",
+    "model.bin",
+    "tokenizer.json",
+    "vocabulary.*",
+]
+
+
+def _repo_id(model_name):
+    """模型名对应的 Hugging Face 仓库（faster-whisper 中 large 指向 large-v3）"""
+    if model_name == "large":
+        model_name = "large-v3"
+    return f"Systran/faster-whisper-{model_name}"
+
+
+def _has_any_entry(path):
+    """目录存在且非空（只读取第一个条目，不列出整个目录）"""
+    try:
+        with os.scandir(path) as it:
+            return next(it, None) is not None
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+
+
+def _materialize(model_name, models_dir):
+    """
+    只把模型文件下载到 models 目录，不构造 WhisperModel（不加载权重、不初始化 CTranslate2）。
+    目录结构与 WhisperModel(download_root=models_dir) 的缓存一致，运行时直接命中。
+    """
+    from huggingface_hub import snapshot_download
+
+    # 检查模型是否已存在
+    model_path = os.path.join(models_dir, model_name)
+    if _has_any_entry(model_path):
+        return f"✓ 模型 {model_name} 已存在，跳过下载"
+
+    snapshot_download(
+        repo_id=_repo_id(model_name),
+        cache_dir=models_dir,
+        allow_patterns=MODEL_FILE_PATTERNS,
+        max_workers=FILE_WORKERS,
+        etag_timeout=30,
+    )
+    return f"✓ 模型 {model_name} 下载成功！"
+
+
+def _download_models(model_names):
+    """并行下载指定的 Whisper 模型，返回 (成功数, 失败数)"""
+    # stslib.cfg 会导入 torch，只在真正下载 Whisper 模型时才导入
+    from stslib import cfg
 
-def download_whisper_models():
-    """下载所有 Whisper 模型"""
-    print("=" * 60)
-    print("开始下载 Whisper 语音识别模型...")
-    print("=" * 60)
-    
     models_dir = os.path.join(cfg.ROOT_DIR, "models")
     os.makedirs(models_dir, exist_ok=True)
     print(f"模型保存目录: {models_dir}\n")
     
-    sets = cfg.parse_ini()
-    device = sets.get('devtype', 'cpu')
-    
     success_count = 0
     fail_count = 0
-    
-    for model_name in WHISPER_MODELS:
-        print(f"\n[{success_count + fail_count + 1}/{len(WHISPER_MODELS)}] 正在下载模型: {model_name}")
-        print("-" * 60)
-        
-        try:
-            # 检查模型是否已存在
-            model_path = os.path.join(models_dir, model_name)
-            if os.path.exists(model_path) and os.listdir(model_path):
-                print(f"✓ 模型 {model_name} 已存在，跳过下载")
+
+    print(f"正在从 Hugging Face 并行下载 {len(model_names)} 个模型（同时 {DOWNLOAD_WORKERS} 个）...")
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        futures = {executor.submit(_materialize, model_name, models_dir): model_name for model_name in model_names}
+        for future in as_completed(futures):
+            model_name = futures[future]
+            print(f"\n[{success_count + fail_count + 1}/{len(model_names)}] {model_name}")
+            print("-" * 60)
+            try:
+                print(future.result())
                 success_count += 1
-                continue
-            
-            # 下载模型
-            print(f"正在从 Hugging Face 下载 {model_name}...")
-            model = WhisperModel(
-                model_name,
-                device=device,
-                download_root=models_dir
-            )
-            print(f"✓ 模型 {model_name} 下载成功！")
-            success_count += 1
-            
-            # 释放内存
-            del model
-            import gc
-            gc.collect()
-            
-        except Exception as e:
-            print(f"✗ 模型 {model_name} 下载失败: {str(e)}")
-            fail_count += 1
-            continue
+            except Exception as e:
+                print(f"✗ 模型 {model_name} 下载失败: {str(e)}")
+                fail_count += 1
+    return success_count, fail_count
+
+
+def _select_models(selected):
+    """
+    把用户输入的编号（如 "1,2,3"）转换为模型名列表，忽略超出范围的编号
+    输入格式错误时抛出 ValueError
+    """
+    indices = [int(x.strip()) - 1 for x in selected.split(',')]
+    return [WHISPER_MODELS[i] for i in indices if 0 <= i < len(WHISPER_MODELS)]
+
+
+def download_whisper_models():
+    """下载所有 Whisper 模型"""
+    print("=" * 60)
+    print("开始下载 Whisper 语音识别模型...")
+    print("=" * 60)
+    
+    success_count, fail_count = _download_models(WHISPER_MODELS)
     
     print("\n" + "=" * 60)
     print(f"Whisper 模型下载完成！")
@@ -149,7 +198,6 @@ def download_pyannote_model():
         
         # 释放内存
         del pipeline
-        import gc
         gc.collect()
         
         return True
@@ -161,6 +209,10 @@ def download_pyannote_model():
 
 def main():
     """主函数"""
+    # 加载 .env 文件（HF_TOKEN 等）
+    from dotenv import load_dotenv
+    load_dotenv()
+    
     print("\n" + "=" * 60)
     print("模型预下载工具")
     print("=" * 60)
@@ -193,30 +245,11 @@ def main():
         selected = input("\n请输入要下载的模型编号（用逗号分隔，如 1,2,3）: ").strip()
         if selected:
             try:
-                indices = [int(x.strip()) - 1 for x in selected.split(',')]
-                selected_models = [WHISPER_MODELS[i] for i in indices if 0 <= i < len(WHISPER_MODELS)]
+                selected_models = _select_models(selected)
                 
                 if selected_models:
                     print(f"\n将下载以下模型: {', '.join(selected_models)}")
-                    models_dir = os.path.join(cfg.ROOT_DIR, "models")
-                    os.makedirs(models_dir, exist_ok=True)
-                    sets = cfg.parse_ini()
-                    device = sets.get('devtype', 'cpu')
-                    
-                    for model_name in selected_models:
-                        print(f"\n正在下载: {model_name}")
-                        try:
-                            model = WhisperModel(
-                                model_name,
-                                device=device,
-                                download_root=models_dir
-                            )
-                            print(f"✓ {model_name} 下载成功")
-                            del model
-                            import gc
-                            gc.collect()
-                        except Exception as e:
-                            print(f"✗ {model_name} 下载失败: {str(e)}")
+                    _download_models(selected_models)
                 else:
                     print("未选择有效模型")
             except ValueError:
@@ -4,9 +4,62 @@
 随机密码生成工具
 """
 
-import random
+import functools
+import inspect
+import os
+import secrets
 import string
-from typing import Dict, List
+from typing import Dict, List, Tuple
+
+# 各类字符集合，导入时构造一次
+_UPPER = frozenset(string.ascii_uppercase)
+_LOWER = frozenset(string.ascii_lowercase)
+_DIGITS = frozenset(string.digits)
+_SPECIAL = frozenset("!@#$%^&*()_+-=[]{}|;:,.<>?")
+# 相似字符（如 0, O, l, 1）
+_SIMILAR = frozenset("0O1lI")
+# 易混淆字符（如 I, l, |）
+_AMBIG = frozenset("Il|1O0")
+# 密码使用系统提供的加密安全随机数
+_RANDOM = secrets.SystemRandom()
+# generate_password 中决定字符池的选项（顺序与 _char_pools 参数一致）
+_OPTION_NAMES = (
+    "include_uppercase", "include_lowercase", "include_digits", "include_special",
+    "exclude_similar", "exclude_ambiguous",
+)
+
+
+@functools.lru_cache(maxsize=64)
+def _char_pools(
+    include_uppercase: bool,
+    include_lowercase: bool,
+    include_digits: bool,
+    include_special: bool,
+    exclude_similar: bool,
+    exclude_ambiguous: bool
+) -> Tuple[str, Tuple[str, ...]]:
+    """
+    按选项构造（总字符池, 各类字符池），同一组选项只计算一次
+    """
+    excluded = (_SIMILAR if exclude_similar else frozenset()) | (_AMBIG if exclude_ambiguous else frozenset())
+    
+    char_sets = []
+    for enabled, category in (
+        (include_uppercase, _UPPER),
+        (include_lowercase, _LOWER),
+        (include_digits, _DIGITS),
+        (include_special, _SPECIAL),
+    ):
+        if enabled:
+            pool = ''.join(sorted(category - excluded))
+            if pool:
+                char_sets.append(pool)
+    
+    chars = ''.join(char_sets)
+    # 如果字符集为空，使用默认字符集
+    if not chars:
+        chars = string.ascii_letters + string.digits
+    return chars, tuple(char_sets)
 
 
 def generate_password(
@@ -33,94 +86,63 @@ def generate_password(
     Returns:
         Dict: 包含密码和强度信息的字典
     """
-    # 验证长度
+    length = _clamp_length(length)
+    options = (
+        include_uppercase, include_lowercase, include_digits, include_special,
+        exclude_similar, exclude_ambiguous
+    )
+    chars, char_sets = _char_pools(*options)
+    fill = _random_string(chars, length - len(char_sets))
+    return _assemble(char_sets, fill, options)
+
+
+def _clamp_length(length: int) -> int:
+    """验证长度（8-128）"""
     if length < 8:
-        length = 8
-    elif length > 128:
-        length = 128
-    
-    # 构建字符集
-    chars = ""
-    
-    if include_uppercase:
-        chars += string.ascii_uppercase
-    if include_lowercase:
-        chars += string.ascii_lowercase
-    if include_digits:
-        chars += string.digits
-    if include_special:
-        chars += "!@#$%^&*()_+-=[]{}|;:,.<>?"
-    
-    # 排除相似字符
-    if exclude_similar:
-        similar_chars = "0O1lI"
-        chars = ''.join(c for c in chars if c not in similar_chars)
-    
-    # 排除易混淆字符
-    if exclude_ambiguous:
-        ambiguous_chars = "Il|1O0"
-        chars = ''.join(c for c in chars if c not in ambiguous_chars)
-    
+        return 8
+    if length > 128:
+        return 128
+    return length
+
+
+@functools.lru_cache(maxsize=64)
+def _translate_table(chars: str) -> Tuple[bytes, bytes]:
+    """
+    把随机字节映射为字符池中字符的转换表：字节 b 映射为 chars[b % n]。
+    256 不能被 n 整除时，末尾多出的字节值会带来偏差，放进删除列表（拒绝采样）
+    """
+    n = len(chars)
+    limit = 256 - 256 % n
+    table = bytes(ord(chars[b % n]) if b < limit else 0 for b in range(256))
+    return table, bytes(range(limit, 256))
+
+
+def _random_string(chars: str, k: int) -> str:
+    """
+    从 chars 中均匀随机选取 k 个字符：
+    一次读取一批 os.urandom 字节，用 bytes.translate 在 C 层完成映射和拒绝采样
+    """
+    table, delete = _translate_table(chars)
+    out = b""
+    while len(out) < k:
+        # 多读一些字节，抵消被拒绝的部分
+        need = k - len(out)
+        out += os.urandom(need + need // 2 + 8).translate(table, delete)
+    return out[:k].decode("ascii")
+
+
+def _assemble(char_sets: Tuple[str, ...], fill: str, options: tuple) -> Dict:
+    """每类字符各取一个，加上填充字符后打乱，返回密码和强度信息"""
     # 确保至少包含每种类型的字符
-    password_chars = []
-    char_sets = []
-    
-    if include_uppercase:
-        uppercase_chars = string.ascii_uppercase
-        if exclude_similar:
-            uppercase_chars = ''.join(c for c in uppercase_chars if c not in "O")
-        if exclude_ambiguous:
-            uppercase_chars = ''.join(c for c in uppercase_chars if c not in "I")
-        if uppercase_chars:
-            char_sets.append(uppercase_chars)
-            password_chars.append(random.choice(uppercase_chars))
-    
-    if include_lowercase:
-        lowercase_chars = string.ascii_lowercase
-        if exclude_similar:
-            lowercase_chars = ''.join(c for c in lowercase_chars if c not in "l1")
-        if exclude_ambiguous:
-            lowercase_chars = ''.join(c for c in lowercase_chars if c not in "l|")
-        if lowercase_chars:
-            char_sets.append(lowercase_chars)
-            password_chars.append(random.choice(lowercase_chars))
-    
-    if include_digits:
-        digit_chars = string.digits
-        if exclude_similar:
-            digit_chars = ''.join(c for c in digit_chars if c not in "01")
-        if exclude_ambiguous:
-            digit_chars = ''.join(c for c in digit_chars if c not in "01")
-        if digit_chars:
-            char_sets.append(digit_chars)
-            password_chars.append(random.choice(digit_chars))
-    
-    if include_special:
-        special_chars = "!@#$%^&*()_+-=[]{}|;:,.<>?"
-        if exclude_ambiguous:
-            special_chars = ''.join(c for c in special_chars if c not in "|")
-        if special_chars:
-            char_sets.append(special_chars)
-            password_chars.append(random.choice(special_chars))
-    
-    # 如果字符集为空，使用默认字符集
-    if not chars:
-        chars = string.ascii_letters + string.digits
-    
-    # 填充剩余长度
-    remaining_length = length - len(password_chars)
-    for _ in range(remaining_length):
-        password_chars.append(random.choice(chars))
+    password_chars = [secrets.choice(category) for category in char_sets]
+    password_chars.extend(fill)
     
     # 打乱顺序
-    random.shuffle(password_chars)
+    _RANDOM.shuffle(password_chars)
     password = ''.join(password_chars)
     
     # 计算密码强度
-    strength = calculate_strength(
-        password, include_uppercase, include_lowercase, 
-        include_digits, include_special
-    )
+    strength = calculate_strength(password, *options[:4])
     
     return {
         "password": password,
@@ -205,9 +227,19 @@ def generate_multiple_passwords(count: int = 5, **kwargs) -> List[Dict]:
     elif count > 50:
         count = 50
     
-    passwords = []
-    for _ in range(count):
-        passwords.append(generate_password(**kwargs))
-    
-    return passwords
-
+    # 按 generate_password 的默认值补全参数
+    args = inspect.signature(generate_password).bind(**kwargs)
+    args.apply_defaults()
+    params = args.arguments
+    length = _clamp_length(params["length"])
+    options = tuple(params[name] for name in _OPTION_NAMES)
+    
+    # 所有密码的填充字符一次生成，再按长度切分
+    chars, char_sets = _char_pools(*options)
+    fill_length = length - len(char_sets)
+    fill = _random_string(chars, fill_length * count)
+    
+    return [
+        _assemble(char_sets, fill[i * fill_length:(i + 1) * fill_length], options)
+        for i in range(count)
+    ]
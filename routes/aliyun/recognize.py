@@ -6,6 +6,7 @@
 
 from flask import request, jsonify
 from aliyun import aliyun_web_tool
+from routes.core.blocking import run_blocking
 
 
 def aliyun_recognize():
@@ -19,7 +20,8 @@ def aliyun_recognize():
     try:
         flask_log2 = "[AliyunASR][Flask] 调用 aliyun_web_tool.recognize_audio() 开始后端识别流程"
         print(flask_log2)
-        result = aliyun_web_tool.recognize_audio(file_url)
+        # 识别耗时较长，在线程池中执行，不阻塞 gevent 服务器处理其他请求
+        result = run_blocking(aliyun_web_tool.recognize_audio, file_url)
         flask_log3 = f"[AliyunASR][Flask] 后端识别流程返回: {result}"
         print(flask_log3)
         
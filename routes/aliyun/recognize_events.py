@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阿里云语音识别 - 任务结果推送接口（SSE）
+"""
+
+import json
+from flask import request, Response
+from aliyun import aliyun_web_tool
+from routes.core.blocking import wait_event
+
+
+# 等待新日志的最长时间（秒），超时后检查一次任务状态
+WAIT_TIMEOUT = 1
+
+
+def aliyun_recognize_events():
+    """按 task_id 推送后台识别任务的日志，任务结束时以 end 事件推送最终记录"""
+    task_id = request.args.get("task_id", "").strip()
+
+    def send_log(message):
+        """发送日志到前端（SSE 格式）"""
+        message_escaped = message.replace('\n', '\\n').replace('\r', '\\r')
+        return f"data: {message_escaped}\n\n"
+
+    def send_end(payload):
+        return "event: end\ndata: " + json.dumps(payload, ensure_ascii=False) + "\n\n"
+
+    def generate():
+        task = aliyun_web_tool.get_recognize_task(task_id)
+        if task is None:
+            yield send_end({"code": 1, "msg": "任务不存在"})
+            return
+
+        sent = 0
+        while True:
+            # 先清除再读取状态，读取之后的新日志会重新 set，不会漏掉
+            task["changed"].clear()
+            task = aliyun_web_tool.get_recognize_task(task_id)
+            logs = task["logs"]
+            while sent < len(logs):
+                yield send_log(logs[sent])
+                sent += 1
+            if task["status"] != "processing":
+                break
+            # gevent 服务器没有 monkey patch，不能用 time.sleep 轮询，等待时让出给其他请求
+            wait_event(task["changed"], WAIT_TIMEOUT)
+
+        if task["status"] == "completed":
+            yield send_end({"code": 0, "msg": task["message"], "data": task["record"]})
+        else:
+            yield send_end({"code": 1, "msg": task["message"]})
+        # end 事件已发出，任务结果不再需要
+        aliyun_web_tool.pop_recognize_task(task_id)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+        'Connection': 'keep-alive'
+    })
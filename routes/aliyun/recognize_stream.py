@@ -10,6 +10,7 @@ import json
 import traceback
 from flask import request, Response, stream_with_context
 from aliyun import aliyun_web_tool
+from routes.core.blocking import queue_get
 
 
 def aliyun_recognize_stream():
@@ -59,10 +60,10 @@ def aliyun_recognize_stream():
             task_thread.daemon = True
             task_thread.start()
             
-            # 实时推送日志
+            # 实时推送日志（gevent 服务器没有 monkey patch，等待日志时让出给其他请求）
             while not result_container['finished'] or not log_queue.empty():
                 try:
-                    log_msg = log_queue.get(timeout=0.1)
+                    log_msg = queue_get(log_queue, 0.1)
                     yield send_log(log_msg)
                 except queue.Empty:
                     continue
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阿里云语音识别 - 提交任务接口（拿到 task_id 立即返回，结果在后台保存）
+"""
+
+from flask import request, jsonify
+from aliyun import aliyun_web_tool
+from routes.core.blocking import run_blocking
+
+
+def aliyun_recognize_submit():
+    """提交识别任务，立即返回 task_id；结果通过 /aliyun_recognize_events 推送"""
+    file_url = request.form.get("file_url", "").strip()
+    print(f"[AliyunASR][Flask] 收到前端提交请求，file_url = {file_url}")
+    if not file_url:
+        return jsonify({"code": 1, "msg": "音频URL不能为空"})
+
+    try:
+        # 提交任务和读取缓存会访问网络/磁盘，在线程池中执行，不阻塞 gevent 服务器处理其他请求
+        result = run_blocking(aliyun_web_tool.submit_recognition, file_url)
+    except Exception as e:
+        print(f"[AliyunASR][Flask] 异常抛出: {e}")
+        return jsonify({"code": 1, "msg": str(e)})
+
+    if not result.get("success"):
+        return jsonify({"code": 1, "msg": result.get("message", "提交失败"), "logs": result.get("logs", [])})
+    return jsonify({
+        "code": 0,
+        "msg": result.get("message", "识别任务已提交"),
+        "task_id": result["task_id"],
+        "status": "processing",
+        "logs": result.get("logs", []),
+    })
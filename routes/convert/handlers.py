@@ -43,12 +43,7 @@ def convert_audio():
         try:
             convert_mp3_tool.convert_to_mp3(src_file, task_id)
         except Exception as e:
-            with convert_mp3_tool.CONVERT_LOCK:
-                convert_mp3_tool.CONVERT_PROGRESS[task_id] = {
-                    "progress": 0,
-                    "status": "error",
-                    "message": str(e)
-                }
+            convert_mp3_tool.set_convert_progress(task_id, 0, "error", str(e))
 
     threading.Thread(target=convert_task, daemon=True).start()
 
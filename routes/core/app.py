@@ -11,6 +11,7 @@ from logging.handlers import RotatingFileHandler
 import warnings
 warnings.filterwarnings('ignore')
 from stslib.cfg import ROOT_DIR
+from routes.core.upload_request import UploadRequest
 
 
 def create_app():
@@ -33,6 +34,8 @@ def create_app():
         static_url_path='/static',
         template_folder=os.path.join(ROOT_DIR, 'templates')
     )
+    # 大文件上传缓存到具名临时文件，保存时无需再复制一遍
+    app.request_class = UploadRequest
     
     # 配置根日志记录器
     root_log = logging.getLogger()  # Flask的根日志记录器
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+在线程池中执行阻塞调用
+
+生产模式使用 gevent 服务器但没有 monkey patch，请求处理中直接调用模型推理、ffmpeg 等耗时操作会阻塞整个事件循环，
+期间其他请求（进度轮询、页面等）都无法响应。这些调用通过 gevent 线程池执行，等待时事件循环继续处理其他请求。
+开发模式（DEV=1）由 Flask 自带服务器在普通线程中处理请求，没有 gevent 事件循环，直接调用即可。
+"""
+
+import queue
+import time
+
+import gevent
+
+# iter_blocking 迭代结束的标记
+_DONE = object()
+# wait_event 在 gevent 服务器上检查事件状态的间隔（秒）
+EVENT_POLL_INTERVAL = 0.05
+
+
+def _server_hub():
+    """
+    当前在 gevent 服务器处理请求的 greenlet 中运行时返回它所在的 hub，否则返回 None
+    开发模式的请求线程、线程池中的线程都不是 gevent.Greenlet，不会为它们创建 hub
+    """
+    if not isinstance(gevent.getcurrent(), gevent.Greenlet):
+        return None
+    return gevent.get_hub()
+
+
+def run_blocking(func, *args, **kwargs):
+    """执行 func(*args, **kwargs) 并返回结果（异常会原样抛出）；在 gevent 服务器上时放到 gevent 线程池中执行"""
+    hub = _server_hub()
+    if hub is None:
+        return func(*args, **kwargs)
+    return hub.threadpool.apply(func, args, kwargs)
+
+
+def iter_blocking(iterable):
+    """逐项迭代 iterable，在 gevent 服务器上时每次取下一项都在线程池中执行（用于逐段解码的转写结果等）"""
+    if _server_hub() is None:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        item = run_blocking(next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+
+def wait_event(event, timeout):
+    """
+    等待 threading.Event 最多 timeout 秒，返回事件是否已设置
+    在 gevent 服务器上以 EVENT_POLL_INTERVAL 间隔检查并让出事件循环，长时间打开的 SSE 连接不占用线程池
+    """
+    if _server_hub() is None:
+        return event.wait(timeout)
+    deadline = time.monotonic() + timeout
+    while not event.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        gevent.sleep(min(EVENT_POLL_INTERVAL, remaining))
+    return True
+
+
+def queue_get(q, timeout):
+    """
+    从 queue.Queue 取出一项，最多等待 timeout 秒，超时抛出 queue.Empty
+    在 gevent 服务器上以 EVENT_POLL_INTERVAL 间隔检查并让出事件循环（推送后台线程日志的 SSE 接口使用）
+    """
+    if _server_hub() is None:
+        return q.get(timeout=timeout)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return q.get_nowait()
+        except queue.Empty:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise
+            gevent.sleep(min(EVENT_POLL_INTERVAL, remaining))
@@ -16,12 +16,15 @@ def setup_environment():
     # macOS 特定：禁用 Objective-C fork 安全检查（关键！）
     os.environ.setdefault('OBJC_DISABLE_INITIALIZE_FORK_SAFETY', 'YES')
     
-    # OpenMP 基础设置
-    os.environ.setdefault('OMP_NUM_THREADS', '1')
-    os.environ.setdefault('MKL_NUM_THREADS', '1')
-    os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
-    os.environ.setdefault('NUMEXPR_NUM_THREADS', '1')
-    os.environ.setdefault('VECLIB_MAXIMUM_THREADS', '1')
+    # OpenMP/BLAS 线程数：默认使用一半 CPU 核心，可通过 AUDIO2TEXT_THREADS 覆盖
+    # Web 服务使用线程而不是 fork 处理任务，单线程 BLAS 只会浪费算力；
+    # 如果在 multiprocessing 子进程中做推理，应在子进程内用 threadpoolctl.threadpool_limits(1) 重新限制
+    threads = os.environ.get('AUDIO2TEXT_THREADS') or str(max(1, (os.cpu_count() or 2) // 2))
+    os.environ.setdefault('OMP_NUM_THREADS', threads)
+    os.environ.setdefault('MKL_NUM_THREADS', threads)
+    os.environ.setdefault('OPENBLAS_NUM_THREADS', threads)
+    os.environ.setdefault('NUMEXPR_NUM_THREADS', threads)
+    os.environ.setdefault('VECLIB_MAXIMUM_THREADS', threads)
     os.environ.setdefault('OMP_DYNAMIC', 'FALSE')
     os.environ.setdefault('KMP_DUPLICATE_LIB_OK', 'TRUE')  # 关键：允许重复的 OpenMP 库
     
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 编码：安装了 orjson 时用它编码（包含大量字幕条目的结果比 jsonify 快得多），否则回退到 jsonify / 标准库 json
+"""
+
+import json
+
+from flask import jsonify, Response
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def json_response(payload, status=200):
+    """把 payload 编码为 JSON 响应"""
+    if HAS_ORJSON:
+        return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+    response = jsonify(payload)
+    response.status_code = status
+    return response
+
+
+def dumps(payload):
+    """把 payload 编码为 JSON 字符串（SSE 推送等需要字符串的场景）"""
+    if HAS_ORJSON:
+        return orjson.dumps(payload).decode("utf-8")
+    return json.dumps(payload, ensure_ascii=False)
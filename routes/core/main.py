@@ -6,11 +6,16 @@
 
 import os
 import threading
+from gevent.pool import Pool
 from gevent.pywsgi import WSGIServer
 from stslib import cfg, tool
 from routes.core.handler import CustomRequestHandler
 from routes.whisper.shibie import shibie
 
+# gevent 服务器同时处理的最大连接数（每个连接一个 greenlet）
+# 任务队列和识别进度保存在进程内存中，所以只能单进程运行，不能用多 worker 的 gunicorn
+WSGI_MAX_CONNECTIONS = 1000
+
 
 def main(app):
     """
@@ -45,7 +50,11 @@ def main(app):
                 if cfg.devtype=='cpu':
                     print('\n如果设备使用英伟达显卡并且CUDA环境已正确安装，可修改set.ini中\ndevtype=cpu 为 devtype=cuda, 然后重新启动以加快识别速度\n')
                 host = cfg.web_address.split(':')
-                http_server = WSGIServer((host[0], int(host[1])), app, handler_class=CustomRequestHandler)
+                http_server = WSGIServer(
+                    (host[0], int(host[1])), app,
+                    handler_class=CustomRequestHandler,
+                    spawn=Pool(WSGI_MAX_CONNECTIONS),
+                )
                 threading.Thread(target=tool.openweb, args=(cfg.web_address,)).start()
                 http_server.serve_forever()
             finally:
@@ -20,6 +20,8 @@ from routes.aliyun import local_files as aliyun_local_files_module
 from routes.aliyun import upload_history_files as aliyun_upload_history_files_module
 from routes.aliyun import recognize as aliyun_recognize_module
 from routes.aliyun import recognize_stream as aliyun_recognize_stream_module
+from routes.aliyun import recognize_submit as aliyun_recognize_submit_module
+from routes.aliyun import recognize_events as aliyun_recognize_events_module
 from routes.aliyun import history as aliyun_history_module
 from routes.aliyun import download as aliyun_download_module
 from routes.aliyun import preview as aliyun_preview_module
@@ -36,6 +38,7 @@ from routes.whisper import process as whisper_process_module
 from routes.whisper import test_process as whisper_test_process_module
 from routes.whisper import progressbar as whisper_progressbar_module
 from routes.whisper import api as whisper_api_module
+from routes.whisper import unload_models as whisper_unload_models_module
 
 
 def register_routes(app):
@@ -177,7 +180,7 @@ def register_routes(app):
     
     @app.route('/aliyun_upload_history_files', methods=['GET'])
     def aliyun_upload_history_files():
-        """从 upload_history.json 读取上传历史记录（用于 /aliyun_asr 下拉框）"""
+        """从 server_files 缓存读取上传历史记录（用于 /aliyun_asr 下拉框）"""
         return aliyun_upload_history_files_module.aliyun_upload_history_files()
     
     @app.route('/aliyun_recognize', methods=['POST'])
@@ -191,6 +194,17 @@ def register_routes(app):
         """使用阿里云对给定的音频 URL 进行语音识别（流式传输日志版本）"""
         return aliyun_recognize_stream_module.aliyun_recognize_stream()
     
+    @app.route('/aliyun_recognize_submit', methods=['POST'])
+    def aliyun_recognize_submit():
+        """提交阿里云识别任务，拿到 task_id 立即返回"""
+        return aliyun_recognize_submit_module.aliyun_recognize_submit()
+    
+    @app.route('/aliyun_recognize_events', methods=['GET'])
+    @stream_with_context
+    def aliyun_recognize_events():
+        """按 task_id 推送后台识别任务的日志和最终记录（SSE）"""
+        return aliyun_recognize_events_module.aliyun_recognize_events()
+    
     @app.route('/aliyun_history', methods=['GET'])
     def aliyun_history():
         """获取阿里云语音识别历史记录"""
@@ -227,6 +241,16 @@ def register_routes(app):
         """前端获取进度及完成后的结果"""
         return whisper_progressbar_module.progressbar()
     
+    @app.route('/progress_stream', methods=['GET'])
+    def progress_stream():
+        """SSE 推送识别进度及完成后的结果"""
+        return whisper_progressbar_module.progress_stream()
+    
+    @app.route('/unload_models', methods=['POST'])
+    def unload_models():
+        """手动卸载已加载的识别模型"""
+        return whisper_unload_models_module.unload_models()
+    
     @app.route('/v1/audio/transcriptions', methods=['POST'])
     def transcribe_audio():
         """OpenAI 兼容格式接口"""
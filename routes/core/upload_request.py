@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上传文件的接收与保存
+
+大文件上传时 Werkzeug 默认把内容缓存到匿名临时文件，file.save() 再整体复制一遍到目标路径。
+这里让大文件直接缓存到 TMP_DIR 下的具名临时文件，保存时用硬链接代替复制。
+"""
+
+import os
+import tempfile
+from flask import Request
+from stslib import cfg
+
+# 小于该大小（字节）的上传内容保存在内存中，与 Werkzeug 默认一致
+MEMORY_UPLOAD_LIMIT = 500 * 1024
+# 无法硬链接时按块复制的大小（字节）
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class UploadRequest(Request):
+    """大文件上传缓存到 TMP_DIR 下的具名临时文件（与保存目标在同一文件系统，可直接硬链接）"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= MEMORY_UPLOAD_LIMIT:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return tempfile.NamedTemporaryFile("wb+", dir=cfg.TMP_DIR, prefix=".upload-")
+
+
+def save_upload(file, dst):
+    """
+    保存上传的文件到 dst：内容已在具名临时文件中时创建硬链接，不再复制文件内容；
+    否则（内存中的小文件、跨文件系统等）按块复制
+    """
+    stream = file.stream
+    name = getattr(stream, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        try:
+            stream.flush()
+            if os.path.lexists(dst):
+                os.remove(dst)
+            os.link(name, dst)
+            return
+        except OSError:
+            stream.seek(0)
+    file.save(dst, buffer_size=COPY_BUFFER_SIZE)
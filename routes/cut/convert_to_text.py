@@ -12,6 +12,7 @@ import traceback
 from flask import request, Response
 from stslib import cfg
 from aliyun import cut_convert_to_text as cut_convert_module
+from routes.core.blocking import queue_get
 
 
 def cut_convert_to_text():
@@ -75,10 +76,10 @@ def cut_convert_to_text():
             task_thread.daemon = True
             task_thread.start()
             
-            # 实时推送日志
+            # 实时推送日志（gevent 服务器没有 monkey patch，等待日志时让出给其他请求）
             while not result_container['finished'] or not log_queue.empty():
                 try:
-                    log_msg = log_queue.get(timeout=0.1)
+                    log_msg = queue_get(log_queue, 0.1)
                     yield send_log(log_msg)
                 except queue.Empty:
                     continue
@@ -89,7 +90,7 @@ def cut_convert_to_text():
             # 发送剩余的日志
             while not log_queue.empty():
                 try:
-                    log_msg = log_queue.get(timeout=0.1)
+                    log_msg = queue_get(log_queue, 0.1)
                     yield send_log(log_msg)
                 except queue.Empty:
                     break
@@ -7,6 +7,7 @@
 import os
 from flask import request, jsonify
 from stslib import cfg
+from routes.core.upload_request import save_upload
 
 
 def upload():
@@ -26,7 +27,7 @@ def upload():
             return jsonify({'code': 0, 'msg': cfg.transobj['lang1'], "data": os.path.basename(saved_file)})
         
         # 保存上传的文件，保持原始格式
-        audio_file.save(saved_file)
+        save_upload(audio_file, saved_file)
         
         # 返回成功的响应，使用原始文件名
         return jsonify({'code': 0, 'msg': cfg.transobj['lang1'], "data": os.path.basename(saved_file)})
@@ -11,6 +11,7 @@ import json
 from datetime import datetime
 from flask import request, render_template, jsonify, Response, stream_with_context
 from stslib import cfg
+from routes.core.upload_request import save_upload
 import stslib
 from werkzeug.utils import secure_filename
 from server_upload import upload_to_server_tool, server_files_cache, db as db_module
@@ -46,7 +47,7 @@ def upload_to_server():
         print(f"[upload_to_server] 源文件名称(原始): {raw_filename!r}")
         print(f"[upload_to_server] 源文件名称(安全化): {safe_filename!r}")
         temp_file = os.path.join(cfg.TMP_DIR, safe_filename)
-        file.save(temp_file)
+        save_upload(file, temp_file)
         
         # ================== 先写入数据库一条占位记录 ==================
         try:
@@ -294,63 +295,50 @@ def batch_delete_upload():
             current_app.logger.error(f'[batch_delete_upload] 获取文件列表失败: {e}')
         return jsonify({"code": 1, "msg": f"获取文件列表失败: {str(e)}"})
     
-    # 逐个删除
+    # 先筛出存在的记录
+    valid_ids = []
     for record_id in ids:
-        try:
-            record_id_str = str(record_id).strip()
-            if not record_id_str:
-                failed_count += 1
-                failed_ids.append(str(record_id))
-                continue
-            
-            file_info = file_dict.get(record_id_str)
-            if not file_info:
-                if current_app:
-                    current_app.logger.warning(f'[batch_delete_upload] 记录不存在: ID={record_id_str}')
-                failed_count += 1
-                failed_ids.append(record_id_str)
-                continue
-            
-            file_name = file_info.get('file_name', '未知文件')
-            
-            # 删除服务器上的文件
-            if current_app:
-                current_app.logger.info(f'[batch_delete_upload] 开始删除文件: {file_name}, ID={record_id_str}')
-            
-            result = upload_to_server_tool.delete_server_file_by_id(record_id_str)
-            if not result.get("success"):
-                error_msg = result.get("message", "删除服务器文件失败")
-                if current_app:
-                    current_app.logger.error(f'[batch_delete_upload] 删除服务器文件失败: ID={record_id_str}, {error_msg}')
-                failed_count += 1
-                failed_ids.append(record_id_str)
-                continue
-            
-            if current_app:
-                current_app.logger.info(f'[batch_delete_upload] 服务器文件删除成功: {file_name}')
-            
-            # 删除数据库记录
-            try:
-                db_module.delete_file_by_id(int(record_id_str))
-                if current_app:
-                    current_app.logger.info(f'[batch_delete_upload] 数据库记录删除成功: ID={record_id_str}')
-                success_count += 1
-            except Exception as e:
-                # 即使数据库删除失败，也计入成功（因为服务器文件已删除）
-                if current_app:
-                    current_app.logger.error(f'[batch_delete_upload] 删除数据库记录失败: ID={record_id_str}, {e}')
-                success_count += 1  # 服务器文件已删除，算作成功
-                
-        except ValueError as e:
+        record_id_str = str(record_id).strip()
+        if not record_id_str or record_id_str not in file_dict:
+            if record_id_str and current_app:
+                current_app.logger.warning(f'[batch_delete_upload] 记录不存在: ID={record_id_str}')
+            failed_count += 1
+            failed_ids.append(record_id_str or str(record_id))
+            continue
+        valid_ids.append(record_id_str)
+    
+    # 一个连接、一条命令删除所有服务器文件
+    failed = {}
+    if valid_ids:
+        if current_app:
+            current_app.logger.info(f'[batch_delete_upload] 开始删除 {len(valid_ids)} 个文件: ID={",".join(valid_ids)}')
+        result = upload_to_server_tool.delete_server_files_by_ids(valid_ids)
+        failed = result.get("failed", {})
+        # 整体失败但没有列出具体文件时（如配置错误），所有文件都算删除失败
+        if not result.get("success") and not failed:
+            failed = {record_id_str: result.get("message", "删除失败") for record_id_str in valid_ids}
+    
+    for record_id_str in valid_ids:
+        if record_id_str in failed:
             if current_app:
-                current_app.logger.error(f'[batch_delete_upload] ID格式错误: {record_id}, {e}')
+                current_app.logger.error(f'[batch_delete_upload] 删除服务器文件失败: ID={record_id_str}, {failed[record_id_str]}')
             failed_count += 1
-            failed_ids.append(str(record_id))
+            failed_ids.append(record_id_str)
+            continue
+        
+        if current_app:
+            current_app.logger.info(f'[batch_delete_upload] 服务器文件删除成功: {file_dict[record_id_str].get("file_name", "未知文件")}')
+        
+        # 删除数据库记录
+        try:
+            db_module.delete_file_by_id(int(record_id_str))
+            if current_app:
+                current_app.logger.info(f'[batch_delete_upload] 数据库记录删除成功: ID={record_id_str}')
         except Exception as e:
+            # 即使数据库删除失败，也计入成功（因为服务器文件已删除）
             if current_app:
-                current_app.logger.error(f'[batch_delete_upload] 删除失败: ID={record_id}, {e}')
-            failed_count += 1
-            failed_ids.append(str(record_id))
+                current_app.logger.error(f'[batch_delete_upload] 删除数据库记录失败: ID={record_id_str}, {e}')
+        success_count += 1
     
     # 返回结果
     msg = f"批量删除完成：成功 {success_count} 条"
@@ -7,6 +7,7 @@
 import os
 from flask import request, jsonify
 from stslib import cfg
+from routes.core.upload_request import save_upload
 from werkzeug.utils import secure_filename
 
 
@@ -23,7 +24,7 @@ def upload_to_server():
         # 保存临时文件
         filename = secure_filename(file.filename)
         temp_file = os.path.join(cfg.TMP_DIR, filename)
-        file.save(temp_file)
+        save_upload(file, temp_file)
         
         # 返回临时文件路径，让前端通过 SSE 获取处理进度
         return jsonify({
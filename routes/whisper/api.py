@@ -4,31 +4,41 @@
 API 接口 - OpenAI 兼容格式和原 API 接口
 """
 
-import os
-import shutil
-import time
 import re
-from flask import request, jsonify, Response
+from faster_whisper import decode_audio
+from flask import request, jsonify, Response, stream_with_context
 from stslib import cfg
 from stslib import tool
-from werkzeug.utils import secure_filename
-import uuid
-from faster_whisper import WhisperModel
+from routes.core.blocking import run_blocking, iter_blocking
+from routes.core.json_response import json_response
+from routes.whisper.models import get_model, get_whisper_model
 
 
-def _api_process(model_name, wav_file, language=None, response_format="text", prompt=None):
-    """API 接口调用"""
-    try:
-        sets=cfg.parse_ini()
-        if model_name.startswith('distil-'):
-            model_name = model_name.replace('-whisper', '')
-        model = WhisperModel(
-            model_name, 
-            device=sets.get('devtype'), 
-            download_root=cfg.ROOT_DIR + "/models"
-        )
-    except Exception as e:
-        raise
+# 字幕文本清理：HTML 数字实体、只含标点/数字/空白的无效文本
+_HTML_ENTITY_RE = re.compile(r'&#\d+;')
+_PUNCT_ONLY_RE = re.compile(r'^[，。、？''""；：（｛｝【】）:;"\'\s \d`!@#$%^&*()_+=.,?/\\-]*$')
+
+
+def _clean_text(text):
+    """清理片段文本，无有效字符时返回 None"""
+    text = text.strip().replace('&#39;', "'")
+    text = _HTML_ENTITY_RE.sub('', text)
+    if not text or _PUNCT_ONLY_RE.match(text) or len(text) <= 1:
+        return None
+    return text
+
+
+def _transcribe(model_name, wav_file, language=None, prompt=None):
+    """用缓存的模型转写音频，返回片段生成器（迭代时逐段解码）"""
+    sets=cfg.parse_ini()
+    # 复用已加载的模型，不再每次请求重新加载
+    # CUDA 上开启 vad 时使用批量推理管道：VAD 切出的语音块按批并行解码
+    if sets.get('devtype') == 'cuda' and sets.get('vad'):
+        model = get_model(model_name, sets)
+        batch_options = {"batch_size": cfg.get_batch_size(sets), "vad_filter": True}
+    else:
+        model = get_whisper_model(model_name, sets)
+        batch_options = {"vad_filter": sets.get('vad')}
         
     segments,info = model.transcribe(
         wav_file, 
@@ -36,39 +46,73 @@ def _api_process(model_name, wav_file, language=None, response_format="text", pr
         best_of=sets.get('best_of'),
         temperature=0 if sets.get('temperature')==0 else [0.0,0.2,0.4,0.6,0.8,1.0],
         condition_on_previous_text=sets.get('condition_on_previous_text'),
-        vad_filter=sets.get('vad'),    
         language=language if language and language !='auto' else None,
-        initial_prompt=sets.get('initial_prompt_zh') if not prompt else prompt
+        initial_prompt=sets.get('initial_prompt_zh') if not prompt else prompt,
+        **batch_options
     )
-    raw_subtitles = []
-    for  segment in segments:
-        start = int(segment.start * 1000)
-        end = int(segment.end * 1000)
-        startTime = tool.ms_to_time_string(ms=start)
-        endTime = tool.ms_to_time_string(ms=end)
-        startReadable = tool.ms_to_readable_time(ms=start)
-        endReadable = tool.ms_to_readable_time(ms=end)
-        text = segment.text.strip().replace('&#39;', "'")
-        text = re.sub(r'&#\d+;', '', text)
+    return segments
+
+
+def _iter_srt(segments):
+    """逐段生成 srt 字幕，解码出一段就输出一段"""
+    line = 0
+    for segment in segments:
+        text = _clean_text(segment.text)
+        if text is None:
+            continue
+        line += 1
+        startTime = tool.ms_to_time_string(ms=int(segment.start * 1000))
+        endTime = tool.ms_to_time_string(ms=int(segment.end * 1000))
+        yield ('\n' if line > 1 else '') + f'{line}\n{startTime} --> {endTime}\n{text}\n'
+
+
+def _format_json(line, start_time, end_time, text):
+    return {"line": line, "start_time": start_time, "end_time": end_time, "text": text}
+
+
+def _format_text(line, start_time, end_time, text):
+    return text
 
+
+def _format_readable(line, start_time, end_time, text):
+    return f'{start_time} - {end_time}\n{text}'
+
+
+def _format_srt(line, start_time, end_time, text):
+    return f'{line}\n{start_time} --> {end_time}\n{text}\n'
+
+
+# 各返回格式的单条字幕格式化函数，未列出的格式按 srt 处理
+_API_FORMATTERS = {'json': _format_json, 'text': _format_text, 'readable': _format_readable}
+
+
+def _api_process(model_name, wav_file, language=None, response_format="text", prompt=None):
+    """API 接口调用"""
+    segments = list(_transcribe(model_name, wav_file, language=language, prompt=prompt))
+    # 一次性格式化所有片段的时间，只计算当前返回格式用到的那种
+    segment_times = tool.segment_time_strings(segments, response_format)
+    # 循环前选定格式化函数，不再逐段比较 response_format
+    formatter = _API_FORMATTERS.get(response_format, _format_srt)
+    raw_subtitles = []
+    for segment, (startTime, endTime) in zip(segments, segment_times):
         # 无有效字符
-        if not text or re.match(r'^[，。、？''""；：（｛｝【】）:;"\'\s \d`!@#$%^&*()_+=.,?/\\-]*$', text) or len(text) <= 1:
+        text = _clean_text(segment.text)
+        if text is None:
             continue
-        if response_format == 'json':
-            # 原语言字幕
-            raw_subtitles.append(
-                {"line": len(raw_subtitles) + 1, "start_time": startTime, "end_time": endTime, "text": text})
-        elif response_format == 'text':
-            raw_subtitles.append(text)
-        elif response_format == 'readable':
-            raw_subtitles.append(f'{startReadable} - {endReadable}\n{text}')
-        else:
-            raw_subtitles.append(f'{len(raw_subtitles) + 1}\n{startTime} --> {endTime}\n{text}\n')
+        raw_subtitles.append(formatter(len(raw_subtitles) + 1, startTime, endTime, text))
     if response_format != 'json':
         raw_subtitles = "\n".join(raw_subtitles)
     return raw_subtitles
 
 
+def _upload_audio(file):
+    """
+    把上传的音频解码为 faster-whisper 可直接使用的 16kHz 单声道数组，不先保存到 TMP_DIR：
+    用 PyAV 在进程内直接从上传的文件流解码（与 faster-whisper 内部解码相同），不再为每个请求启动 ffmpeg 进程
+    """
+    return decode_audio(file.stream)
+
+
 def transcribe_audio():
     """OpenAI 兼容格式接口"""
     if 'file' not in request.files:
@@ -76,10 +120,6 @@ def transcribe_audio():
     file = request.files['file']
     if file.filename == '':
         return jsonify({"error": "未选择文件"}), 400
-    if not shutil.which('ffmpeg'):
-        return jsonify({"error": "FFmpeg 未安装或未在系统 PATH 中"}), 500
-    if not shutil.which('ffprobe'):
-        return jsonify({"error": "ffprobe 未安装或未在系统 PATH 中"}), 500
     # 用 model 参数传递特殊要求，例如 ----*---- 分隔字符串和json
     model = request.form.get('model', '')
     # prompt 用于获取语言
@@ -87,39 +127,22 @@ def transcribe_audio():
     language = request.form.get('language', '')
     response_format = request.form.get('response_format', 'text')
 
-    original_filename = secure_filename(file.filename)
-    wav_name = str(uuid.uuid4())+f"_{original_filename}"
-    temp_original_path = os.path.join(cfg.TMP_DIR,  wav_name)
-    wav_file = os.path.join(cfg.TMP_DIR,  wav_name+"-target.wav")
-    file.save(temp_original_path)
-    
-    params = [
-            "-i",
-            temp_original_path,
-            "-ar",
-            "16000",
-            "-ac",
-            "1",
-            wav_file
-        ]
-        
     try:
-        print(params)
-        rs = tool.runffmpeg(params)
-        if rs != 'ok':
-            return jsonify({"error": rs}),500
+        audio = run_blocking(_upload_audio, file)
     except Exception as e:
         print(e)
         return jsonify({"error": str(e)}),500
 
     try:
-        res=_api_process(model_name=model,wav_file=wav_file,language=language,response_format=response_format,prompt=prompt)
         if response_format=='srt':
-            return Response(res,mimetype='text/plain')
+            # srt 边转写边输出，不必等整段音频识别完成
+            segments=run_blocking(_transcribe,model,audio,language=language,prompt=prompt)
+            return Response(stream_with_context(iter_blocking(_iter_srt(segments))),mimetype='text/plain')
+        res=run_blocking(_api_process,model_name=model,wav_file=audio,language=language,response_format=response_format,prompt=prompt)
         
         if response_format =='text':
             res={"text":res}            
-        return jsonify(res)
+        return json_response(res)
     except Exception as e:
         return jsonify({"error":str(e)}),500
 
@@ -133,34 +156,16 @@ def api():
         language = request.form.get("language")
         response_format = request.form.get("response_format",'srt')
 
-        basename = os.path.basename(audio_file.filename)
-        video_file = os.path.join(cfg.TMP_DIR, basename)        
-        audio_file.save(video_file)
-        
-        wav_file = os.path.join(cfg.TMP_DIR, f'{basename}-{time.time()}.wav')
-        params = [
-            "-i",
-            video_file,
-            "-ar",
-            "16000",
-            "-ac",
-            "1",
-            wav_file
-        ]
-        
         try:
-            print(params)
-            rs = tool.runffmpeg(params)
-            if rs != 'ok':
-                return jsonify({"code": 1, "msg": rs})
+            audio = run_blocking(_upload_audio, audio_file)
         except Exception as e:
             print(e)
             return jsonify({"code": 1, "msg": str(e)})
         
-        raw_subtitles=_api_process(model_name=model_name,wav_file=wav_file,language=language,response_format=response_format)        
+        raw_subtitles=run_blocking(_api_process,model_name=model_name,wav_file=audio,language=language,response_format=response_format)        
         if response_format != 'json':
             raw_subtitles = "\n".join(raw_subtitles)
-        return jsonify({"code": 0, "msg": 'ok', "data": raw_subtitles})
+        return json_response({"code": 0, "msg": 'ok', "data": raw_subtitles})
     except Exception as e:
         print(e)
         from flask import current_app
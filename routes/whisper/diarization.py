@@ -4,6 +4,9 @@
 说话人识别相关函数
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import torch
 
 # 说话人识别相关
@@ -17,6 +20,15 @@ except ImportError:
 # 说话人识别管道（全局变量，避免重复加载）
 DIARIZATION_PIPELINE = None
 
+# 说话人分离后台线程：与 Whisper 转写并行执行（单线程，同一时间只用一次管道）
+_DIARIZATION_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="diarization")
+
+# 说话人分离中分段模型和声纹嵌入模型每批处理的窗口数（pyannote 3.1 默认为 1，逐个窗口推理）
+DIARIZATION_BATCH_SIZE = 32
+
+# 与 Whisper 同时在 GPU 上运行时，显存空闲少于该值（字节）则说话人分离改用 CPU，避免显存不足
+DIARIZATION_MIN_FREE_VRAM = 2 * 1024 ** 3
+
 def get_diarization_pipeline(device='cpu'):
     global DIARIZATION_PIPELINE
     if DIARIZATION_PIPELINE is None:
@@ -37,6 +49,17 @@ def get_diarization_pipeline(device='cpu'):
                 "pyannote/speaker-diarization-3.1"
             )
 
+            # 分段和声纹嵌入按批推理，减少逐窗口调用模型的开销
+            for attr in ("segmentation_batch_size", "embedding_batch_size"):
+                if hasattr(DIARIZATION_PIPELINE, attr):
+                    setattr(DIARIZATION_PIPELINE, attr, DIARIZATION_BATCH_SIZE)
+
+            if device == 'cuda':
+                # Ampere 及更新的显卡上用 TF32 做 float32 矩阵乘法，声纹嵌入精度影响可忽略
+                torch.backends.cuda.matmul.allow_tf32 = True
+                torch.backends.cudnn.allow_tf32 = True
+                torch.set_float32_matmul_precision('high')
+
             DIARIZATION_PIPELINE.to(torch.device(device))
             print("pyannote 说话人识别模型加载成功！")
         except Exception as e:
@@ -46,56 +69,108 @@ def get_diarization_pipeline(device='cpu'):
     return DIARIZATION_PIPELINE
 
 
-def perform_diarization(wav_file, device='cpu'):
-    """执行说话人分离，返回时间段和说话人标签的映射"""
+def preload_diarization(device='cpu'):
+    """
+    启动时预加载说话人识别管道并常驻内存；
+    在 cuda 上用 torch.compile 编译分段模型，减少每次推理的内核启动开销（首次推理时编译）
+    """
+    pipeline = get_diarization_pipeline(device)
+    if pipeline is None or device != 'cuda' or not hasattr(torch, 'compile'):
+        return pipeline
+    try:
+        segmentation = pipeline._segmentation
+        segmentation.model = torch.compile(segmentation.model, mode="reduce-overhead")
+        print("pyannote 分段模型已使用 torch.compile 编译")
+    except Exception as e:
+        print(f"torch.compile 编译分段模型失败，继续使用未编译的模型: {e}")
+    return pipeline
+
+
+class SpeakerTurns:
+    """
+    说话人时间段（毫秒），按开始时间排序存放在 NumPy 数组中，
+    匹配片段时用二分查找只检查可能重叠的时间段
+    """
+
+    def __init__(self, starts_ms, ends_ms, speakers):
+        order = np.argsort(np.asarray(starts_ms, dtype=np.int64), kind="stable")
+        self.speaker_names = sorted(set(speakers))
+        speaker_index = {name: i for i, name in enumerate(self.speaker_names)}
+        self.starts_ms = np.asarray(starts_ms, dtype=np.int64)[order]
+        self.ends_ms = np.asarray(ends_ms, dtype=np.int64)[order]
+        self.speaker_ids = np.asarray([speaker_index[s] for s in speakers], dtype=np.int32)[order]
+        # 结束时间的前缀最大值（单调不减），用于二分找到第一个可能与片段重叠的时间段
+        self.max_ends_ms = np.maximum.accumulate(self.ends_ms) if len(order) else self.ends_ms
+
+    def __len__(self):
+        return len(self.starts_ms)
+
+
+def diarization_device(devtype):
+    """说话人分离使用的设备：配置为 cuda、GPU 可用且剩余显存足够时用 cuda，否则用 cpu"""
+    if devtype != 'cuda' or not torch.cuda.is_available():
+        return 'cpu'
+    try:
+        free_bytes, _ = torch.cuda.mem_get_info()
+    except Exception:
+        return 'cuda'
+    return 'cuda' if free_bytes >= DIARIZATION_MIN_FREE_VRAM else 'cpu'
+
+
+def start_diarization(audio, device='cpu'):
+    """在后台线程中开始说话人分离，返回 Future，结果与 perform_diarization 相同"""
+    return _DIARIZATION_EXECUTOR.submit(perform_diarization, audio, device)
+
+
+def perform_diarization(audio, device='cpu'):
+    """
+    执行说话人分离，返回 SpeakerTurns（各时间段及其说话人标签）
+    audio 可以是音频文件路径，也可以是已解码的 16kHz 单声道 float32 数组（与转写共用，避免重复解码）
+    """
     pipeline = get_diarization_pipeline(device)
     if pipeline is None:
         return None
     
+    if isinstance(audio, np.ndarray):
+        audio = {"waveform": torch.from_numpy(audio).unsqueeze(0), "sample_rate": 16000}
+    
     try:
-        # 执行说话人分离
-        diarization = pipeline(wav_file)
+        # 执行说话人分离（只做推理，不记录梯度）
+        with torch.inference_mode():
+            diarization = pipeline(audio)
         
-        # 将结果转换为字典，key为时间段，value为说话人标签
-        speaker_segments = {}
+        # 将时间段转换为毫秒，用于后续匹配
+        starts_ms, ends_ms, speakers = [], [], []
         for turn, _, speaker in diarization.itertracks(yield_label=True):
-            start_time = turn.start
-            end_time = turn.end
-            # 将时间段转换为毫秒，用于后续匹配
-            start_ms = int(start_time * 1000)
-            end_ms = int(end_time * 1000)
-            # 存储每个时间段对应的说话人
-            speaker_segments[(start_ms, end_ms)] = speaker
+            starts_ms.append(int(turn.start * 1000))
+            ends_ms.append(int(turn.end * 1000))
+            speakers.append(speaker)
         
-        return speaker_segments
+        return SpeakerTurns(starts_ms, ends_ms, speakers)
     except Exception as e:
         print(f"说话人分离失败: {e}")
         return None
 
 def get_speaker_for_segment(segment_start, segment_end, speaker_segments):
-    """根据时间段匹配说话人"""
-    if speaker_segments is None:
+    """根据时间段匹配说话人：与片段重叠最多、且重叠超过片段长度 50% 的说话人"""
+    if not speaker_segments:
         return None
     
     segment_start_ms = int(segment_start * 1000)
     segment_end_ms = int(segment_end * 1000)
+    segment_duration = segment_end_ms - segment_start_ms
+    if segment_duration <= 0:
+        return None
     
-    # 找到与当前片段重叠最多的说话人时间段
-    best_speaker = None
-    max_overlap = 0
-    
-    for (spk_start, spk_end), speaker in speaker_segments.items():
-        # 计算重叠时间
-        overlap_start = max(segment_start_ms, spk_start)
-        overlap_end = min(segment_end_ms, spk_end)
-        overlap = max(0, overlap_end - overlap_start)
-        
-        # 如果重叠时间超过片段长度的50%，则认为匹配
-        segment_duration = segment_end_ms - segment_start_ms
-        if segment_duration > 0 and overlap / segment_duration > 0.5:
-            if overlap > max_overlap:
-                max_overlap = overlap
-                best_speaker = speaker
+    # 只有 [lo, hi) 内的时间段可能与片段重叠：之前的都已结束，之后的还没开始
+    lo = np.searchsorted(speaker_segments.max_ends_ms, segment_start_ms, side="right")
+    hi = np.searchsorted(speaker_segments.starts_ms, segment_end_ms, side="left")
+    if lo >= hi:
+        return None
     
-    return best_speaker
-
+    overlap = (np.minimum(speaker_segments.ends_ms[lo:hi], segment_end_ms)
+               - np.maximum(speaker_segments.starts_ms[lo:hi], segment_start_ms))
+    best = int(np.argmax(overlap))
+    if overlap[best] * 2 <= segment_duration:
+        return None
+    return speaker_segments.speaker_names[speaker_segments.speaker_ids[lo + best]]
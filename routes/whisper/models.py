@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whisper 模型的加载与缓存
+
+识别线程、测试识别和 API 接口共用 cfg.MODEL_DICT 中已加载的模型，不再每次请求重新加载
+"""
+
+import threading
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+from stslib import cfg
+
+# 加载模型时加锁，避免多个请求同时加载同一个模型
+_LOAD_LOCK = threading.Lock()
+
+
+def model_key(model, sets, batch_size):
+    """模型缓存键：(模型名, compute_type, 设备, batch_size)"""
+    return (model, cfg.get_compute_type(sets), sets.get('devtype'), batch_size)
+
+
+def load_model(model, sets, batch_size, pinned=False):
+    """加载模型并包装为批量推理管道，放入 cfg.MODEL_DICT 模型缓存（超出上限时卸载最久未用的模型）"""
+    print(f'开始加载模型，若不存在将自动下载')
+    compute_type=cfg.get_compute_type(sets)
+    modelobj= BatchedInferencePipeline(model=WhisperModel(
+        model  if not model.startswith('distil') else  model.replace('-whisper', ''), 
+        device=sets.get('devtype'), 
+        compute_type=compute_type,
+        num_workers=cfg.get_model_workers(sets),
+        flash_attention=cfg.use_flash_attention(sets),
+        download_root=cfg.ROOT_DIR + "/models"
+    ))
+    cfg.MODEL_DICT.put(
+        model_key(model, sets, batch_size), modelobj,
+        cfg.estimate_model_bytes(model, compute_type), cfg.get_model_cache_bytes(sets),
+        pinned=pinned,
+    )
+    return modelobj
+
+
+def get_model(model, sets, batch_size=None):
+    """取出缓存的批量推理管道，不存在时加载；batch_size 为 None 时使用配置的 batch_size"""
+    if batch_size is None:
+        batch_size=cfg.get_batch_size(sets)
+    key=model_key(model, sets, batch_size)
+    modelobj=cfg.MODEL_DICT.get(key)
+    if modelobj is None:
+        with _LOAD_LOCK:
+            # 等锁期间其他线程可能已加载完成
+            modelobj=cfg.MODEL_DICT.get(key) or load_model(model, sets, batch_size)
+    return modelobj
+
+
+def get_whisper_model(model, sets):
+    """取出缓存的 WhisperModel（逐段顺序解码用），与识别线程共用同一份模型权重"""
+    return get_model(model, sets).model
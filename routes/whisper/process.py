@@ -25,12 +25,12 @@ def process():
     if not os.path.exists(wav_file):
         return jsonify({"code": 1, "msg": f"{wav_file} {cfg.transobj['lang5']}"})
 
-    key=f'{wav_name}{model}{language}{data_type}{enable_speaker}'
-    #重设结果为none
-    cfg.progressresult[key]=None
-    # 重设进度为0
-    cfg.progressbar[key]=0
+    # 任务 key 用元组，与 /progressbar 的 _task_key 一致
+    key=(wav_name, model, language, data_type, enable_speaker)
+    # 新建任务状态（进度为0、结果为none），替换同一任务之前的状态
+    state=cfg.TaskState()
+    cfg.TASKS[key]=state
     #存入任务队列
-    cfg.TASK_QUEUE.append({"wav_name":wav_name, "model":model, "language":language, "data_type":data_type, "wav_file":wav_file, "key":key, "enable_speaker":enable_speaker})
+    cfg.TASK_QUEUE.put({"wav_name":wav_name, "model":model, "language":language, "data_type":data_type, "wav_file":wav_file, "key":key, "state":state, "enable_speaker":enable_speaker})
     return jsonify({"code":0, "msg":"ing"})
 
@@ -4,28 +4,80 @@
 获取识别进度和结果
 """
 
-from flask import request, jsonify
+from flask import request, jsonify, Response
 from stslib import cfg
+from routes.core.blocking import wait_event
+from routes.core.json_response import dumps, json_response
 
+# SSE 推送等待进度变化的最长时间（秒），超时后检查一次状态
+STREAM_WAIT_TIMEOUT = 0.5
 
-def progressbar():
-    """前端获取进度及完成后的结果"""
-    wav_name = request.form.get("wav_name").strip()
-    model_name = request.form.get("model")
+
+def _task_key(values):
+    """根据请求参数生成识别任务的 key（与 /process 一致）"""
+    wav_name = values.get("wav_name").strip()
+    model_name = values.get("model")
     # 语言
-    language = request.form.get("language")
+    language = values.get("language")
     # 返回格式 json txt srt
-    data_type = request.form.get("data_type")
+    data_type = values.get("data_type")
     # 是否启用说话人识别
-    enable_speaker = request.form.get("enable_speaker", "off") == "on"
-    key = f'{wav_name}{model_name}{language}{data_type}{enable_speaker}'
-    if key in cfg.progressresult and  isinstance(cfg.progressresult[key],str) and cfg.progressresult[key].startswith('error:'):
-        return jsonify({"code":1,"msg":cfg.progressresult[key][6:]})
+    enable_speaker = values.get("enable_speaker", "off") == "on"
+    return (wav_name, model_name, language, data_type, enable_speaker)
 
-    progressbar = cfg.progressbar.get(key)
-    if progressbar is None:
+
+def progressbar():
+    """前端获取进度及完成后的结果"""
+    state = cfg.TASKS.get(_task_key(request.form))
+    if state is None:
         return jsonify({"code":1,"msg":"No this file"}),500
+    # 先读取结果再读取进度：后台线程先写结果再把进度设为 1
+    result, progressbar = state.result, state.progress
+    if isinstance(result,str) and result.startswith('error:'):
+        return jsonify({"code":1,"msg":result[6:]})
     if progressbar>=1:
-        return jsonify({"code":0, "data":progressbar, "msg":"ok", "result":cfg.progressresult[key]})
-    return jsonify({"code":0, "data":progressbar, "msg":"ok"})
+        # 完成时的响应包含全部识别结果，直接编码为 bytes 返回
+        return json_response({"code":0, "data":progressbar, "msg":"ok", "result":result})
+    # 进度未变化时直接返回 304，前端轮询不必重新编码/解析 JSON
+    etag = f'"{progressbar}"'
+    if request.headers.get("If-None-Match") == etag:
+        return "", 304, {"ETag": etag}
+    response = jsonify({"code":0, "data":progressbar, "msg":"ok"})
+    response.headers["ETag"] = etag
+    return response
+
+
+def progress_stream():
+    """SSE 推送识别进度：进度变化时推送一次，完成或出错时以 end 事件推送结果"""
+    state = cfg.TASKS.get(_task_key(request.args))
+
+    def send(payload, event=None):
+        data = "data: " + dumps(payload) + "\n\n"
+        return f"event: {event}\n{data}" if event else data
+
+    def generate():
+        if state is None:
+            yield send({"code": 1, "msg": "No this file"}, "end")
+            return
+        last = None
+        while True:
+            # 先清除再读取状态，读取之后的更新会重新 set，不会漏掉
+            state.changed.clear()
+            result, progress = state.result, state.progress
+            if isinstance(result, str) and result.startswith('error:'):
+                yield send({"code": 1, "msg": result[6:]}, "end")
+                return
+            if progress >= 1:
+                yield send({"code": 0, "data": progress, "msg": "ok", "result": result}, "end")
+                return
+            if progress != last:
+                last = progress
+                yield send({"code": 0, "data": progress, "msg": "ok"})
+            # gevent 服务器没有 monkey patch，直接 Event.wait 会阻塞整个事件循环，这里让出给其他请求
+            wait_event(state.changed, STREAM_WAIT_TIMEOUT)
 
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+        'Connection': 'keep-alive'
+    })
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+识别结果组装：过滤 Whisper 片段并生成 json/text/readable/srt 格式的字幕
+"""
+
+import io
+import re
+from stslib import cfg
+from stslib import tool
+from routes.whisper.diarization import get_speaker_for_segment
+
+
+# 字幕文本清理：HTML 数字实体、只含标点/数字/空白的无效文本
+_HTML_ENTITY_RE = re.compile(r'&#\d+;')
+_PUNCT_ONLY_RE = re.compile(r'^[，。、？''""；：（｛｝【】）:;"\'\s \d`!@#$%^&*()_+=.,?/\\-]*$')
+
+
+def _speaker_label(segment, speaker_turns):
+    """片段对应的说话人标签：SPEAKER_00 -> A、SPEAKER_01 -> B ...，无法匹配时返回 None"""
+    speaker = get_speaker_for_segment(segment.start, segment.end, speaker_turns)
+    if not speaker:
+        return None
+    try:
+        # 将数字转换为字母：0->A, 1->B, 2->C...
+        return chr(65 + int(speaker.replace("SPEAKER_", "")))  # 65 是 'A' 的 ASCII 码
+    except ValueError:
+        return speaker
+
+
+def _format_text(line, start_time, end_time, text, speaker):
+    return f'说话人{speaker}: {text}' if speaker else text
+
+
+def _format_readable(line, start_time, end_time, text, speaker):
+    if speaker:
+        return f'说话人{speaker}   {start_time} - {end_time}   {text}'
+    return f'{start_time} - {end_time}\n{text}'
+
+
+def _format_srt(line, start_time, end_time, text, speaker):
+    if speaker:
+        return f'{line}\n{start_time} --> {end_time}\n说话人{speaker}: {text}\n'
+    return f'{line}\n{start_time} --> {end_time}\n{text}\n'
+
+
+# 各文本格式的单条字幕格式化函数，未列出的格式按 srt 处理
+_TEXT_FORMATTERS = {'text': _format_text, 'readable': _format_readable}
+
+
+def build_subtitles(segments, data_type, speaker_turns=None):
+    """
+    把 Whisper 片段列表组装为字幕：data_type 为 json 时返回字幕条目列表，否则返回文本；
+    去掉无有效字符的片段，按配置做繁简转换，提供 speaker_turns 时标注说话人
+    """
+    # 一次性格式化所有片段的时间，只计算当前返回格式用到的那种
+    segment_times = tool.segment_time_strings(segments, data_type)
+    # json 格式收集字幕条目，其他格式直接写入文本缓冲区，条目之间以换行分隔
+    items = []
+    buf = io.StringIO()
+    formatter = _TEXT_FORMATTERS.get(data_type, _format_srt)
+    line = 0
+    for segment, (start_time, end_time) in zip(segments, segment_times):
+        text = segment.text.strip().replace('&#39;', "'")
+        text = _HTML_ENTITY_RE.sub('', text)
+
+        # 无有效字符
+        if not text or _PUNCT_ONLY_RE.match(text) or len(text) <= 1:
+            continue
+        if cfg.cc is not None:
+            text = cfg.cc.convert(text)
+        line += 1
+
+        speaker = _speaker_label(segment, speaker_turns) if speaker_turns else None
+        if data_type == 'json':
+            item = {"line": line, "start_time": start_time, "end_time": end_time, "text": text}
+            if speaker:
+                item["speaker"] = f"说话人{speaker}"
+            items.append(item)
+        else:
+            if line > 1:
+                buf.write('\n')
+            buf.write(formatter(line, start_time, end_time, text, speaker))
+    return items if data_type == 'json' else buf.getvalue()
@@ -5,13 +5,16 @@
 """
 
 import os
-import re
-import torch
 from flask import request, jsonify
 from stslib import cfg
 from stslib import tool
-from faster_whisper import WhisperModel
-from routes.whisper.diarization import perform_diarization, get_speaker_for_segment, PYANNOTE_AVAILABLE
+from routes.core.blocking import run_blocking
+from routes.whisper.models import get_whisper_model
+from routes.whisper.diarization import start_diarization, diarization_device, PYANNOTE_AVAILABLE
+from routes.whisper.subtitles import build_subtitles
+
+# 测试识别截取的音频时长（秒）
+TEST_DURATION = 300
 
 
 def test_process():
@@ -29,40 +32,35 @@ def test_process():
         if not os.path.exists(wav_file):
             return jsonify({"code": 1, "msg": f"{wav_file} {cfg.transobj['lang5']}"})
         
-        # 创建测试用的音频文件（截取前5分钟）
-        test_wav_file = os.path.join(cfg.TMP_DIR, f"test_{wav_name}")
-        params = [
-            "-i",
-            wav_file,
-            "-t",
-            "300",  # 截取300秒（5分钟）
-            "-ar",
-            "16000",
-            "-ac",
-            "1",
-            "-y",
-            test_wav_file
-        ]
-        rs = tool.runffmpeg(params)
-        if rs != 'ok':
-            return jsonify({"code": 1, "msg": f"截取音频失败: {rs}"})
+        # 截取前5分钟解码到内存（不再写测试用的临时文件，转写和说话人分离共用）
+        try:
+            audio = run_blocking(tool.ffmpeg_decode_audio, wav_file, duration=TEST_DURATION)
+        except Exception as e:
+            return jsonify({"code": 1, "msg": f"截取音频失败: {e}"})
         
         # 使用_api_process进行识别
         try:
             sets=cfg.parse_ini()
-            if model.startswith('distil-'):
-                model = model.replace('-whisper', '')
-            modelobj = WhisperModel(
-                model, 
-                device=sets.get('devtype'), 
-                download_root=cfg.ROOT_DIR + "/models"
-            )
+            # 复用已加载的模型，不再每次请求重新加载
+            modelobj = run_blocking(get_whisper_model, model, sets)
         except Exception as e:
             return jsonify({"code": 1, "msg": f"加载模型失败: {str(e)}"})
         
         try:
-            segments, info = modelobj.transcribe(
-                test_wav_file, 
+            # 如果启用说话人识别，在后台线程中与转写同时执行说话人分离
+            diarization_future = None
+            if enable_speaker:
+                if not PYANNOTE_AVAILABLE:
+                    print("警告：pyannote.audio 未安装，说话人识别功能不可用。请运行: pip install pyannote.audio")
+                else:
+                    device = diarization_device(sets.get('devtype'))
+                    print(f"测试识别：开始执行说话人识别（设备: {device}）...")
+                    diarization_future = start_diarization(audio, device)
+            
+            # 模型推理等耗时调用在线程池中执行，不阻塞 gevent 服务器处理其他请求
+            segments, info = run_blocking(
+                modelobj.transcribe,
+                audio, 
                 beam_size=sets.get('beam_size'),
                 best_of=sets.get('best_of'),
                 condition_on_previous_text=sets.get('condition_on_previous_text'),
@@ -71,85 +69,22 @@ def test_process():
                 initial_prompt=sets.get('initial_prompt_zh')
             )
             
-            # 如果启用说话人识别，执行说话人分离
+            # 逐段解码（此时说话人分离在后台并行执行），转写完成后再等待说话人分离结果
+            transcribed = run_blocking(list, segments)
             speaker_segments = None
-            if enable_speaker:
-                if not PYANNOTE_AVAILABLE:
-                    print("警告：pyannote.audio 未安装，说话人识别功能不可用。请运行: pip install pyannote.audio")
-                else:
-                    try:
-                        device = 'cuda' if sets.get('devtype') == 'cuda' and torch.cuda.is_available() else 'cpu'
-                        print(f"测试识别：开始执行说话人识别（设备: {device}）...")
-                        speaker_segments = perform_diarization(test_wav_file, device)
-                        if speaker_segments:
-                            print(f"测试识别：说话人识别完成，识别到 {len(speaker_segments)} 个说话人时间段")
-                        else:
-                            print("测试识别：说话人识别返回空结果")
-                    except Exception as e:
-                        print(f"测试识别：说话人识别出错: {e}")
-                        import traceback
-                        traceback.print_exc()
-            
-            raw_subtitles = []
-            for segment in segments:
-                start = int(segment.start * 1000)
-                end = int(segment.end * 1000)
-                startTime = tool.ms_to_time_string(ms=start)
-                endTime = tool.ms_to_time_string(ms=end)
-                startReadable = tool.ms_to_readable_time(ms=start)
-                endReadable = tool.ms_to_readable_time(ms=end)
-                text = segment.text.strip().replace('&#39;', "'")
-                text = re.sub(r'&#\d+;', '', text)
-
-                if not text or re.match(r'^[，。、？''""；：（｛｝【】）:;"\'\s \d`!@#$%^&*()_+=.,?/\\-]*$', text) or len(text) <= 1:
-                    continue
-                if cfg.cc is not None:
-                    text=cfg.cc.convert(text)
-                
-                # 获取说话人信息
-                speaker_label = None
-                if speaker_segments:
-                    speaker = get_speaker_for_segment(segment.start, segment.end, speaker_segments)
-                    if speaker:
-                        speaker_num = speaker.replace("SPEAKER_", "")
-                        try:
-                            speaker_idx = int(speaker_num)
-                            speaker_label = chr(65 + speaker_idx)
-                        except:
-                            speaker_label = speaker
-                
-                if data_type == 'json':
-                    subtitle_item = {"line": len(raw_subtitles) + 1, "start_time": startTime, "end_time": endTime, "text": text}
-                    if speaker_label:
-                        subtitle_item["speaker"] = f"说话人{speaker_label}"
-                    raw_subtitles.append(subtitle_item)
-                elif data_type == 'text':
-                    if speaker_label:
-                        raw_subtitles.append(f'说话人{speaker_label}: {text}')
+            if diarization_future is not None:
+                try:
+                    speaker_segments = run_blocking(diarization_future.result)
+                    if speaker_segments:
+                        print(f"测试识别：说话人识别完成，识别到 {len(speaker_segments)} 个说话人时间段")
                     else:
-                        raw_subtitles.append(text)
-                elif data_type == 'readable':
-                    if speaker_label:
-                        raw_subtitles.append(f'说话人{speaker_label}   {startReadable} - {endReadable}   {text}')
-                    else:
-                        raw_subtitles.append(f'{startReadable} - {endReadable}\n{text}')
-                else:
-                    if speaker_label:
-                        raw_subtitles.append(f'{len(raw_subtitles) + 1}\n{startTime} --> {endTime}\n说话人{speaker_label}: {text}\n')
-                    else:
-                        raw_subtitles.append(f'{len(raw_subtitles) + 1}\n{startTime} --> {endTime}\n{text}\n')
-            
-            if data_type != 'json':
-                result = "\n".join(raw_subtitles)
-            else:
-                result = raw_subtitles
+                        print("测试识别：说话人识别返回空结果")
+                except Exception as e:
+                    print(f"测试识别：说话人识别出错: {e}")
+                    import traceback
+                    traceback.print_exc()
             
-            # 清理测试文件
-            try:
-                if os.path.exists(test_wav_file):
-                    os.remove(test_wav_file)
-            except:
-                pass
+            result = build_subtitles(transcribed, data_type, speaker_segments)
             
             return jsonify({"code": 0, "msg": "测试识别完成", "result": result, "duration": round(info.duration, 2)})
         except Exception as e:
@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+手动卸载已加载的识别模型
+"""
+
+from flask import request, jsonify
+from stslib import cfg
+
+
+def unload_models():
+    """卸载模型缓存中的模型，释放内存/显存；include_pinned=1 时连预加载的常驻模型一起卸载"""
+    include_pinned = request.values.get("include_pinned") == "1"
+    count = cfg.MODEL_DICT.clear(include_pinned=include_pinned)
+    return jsonify({"code": 0, "msg": f"已卸载 {count} 个模型"})
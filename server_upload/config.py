@@ -20,6 +20,8 @@ SERVER_PORT = int(os.getenv("SERVER_UPLOAD_PORT", "22")) # SSH 端口，默认 2
 SERVER_USER = os.getenv("SERVER_UPLOAD_USER", "root")    # SSH 用户名
 SERVER_PASSWORD = os.getenv("SERVER_UPLOAD_PASSWORD")    # SSH 密码（推荐只用环境变量配置）
 SERVER_KEY_PATH = os.getenv("SERVER_UPLOAD_KEY_PATH") or None  # SSH 私钥路径（可选）
+# 上传时改用系统 scp 命令（需要配置私钥且已安装 scp），设为 1 启用
+USE_SCP = os.getenv("SERVER_UPLOAD_USE_SCP") == "1"
 
 # 服务器上的文件存储路径（如：/data/audio）
 SERVER_UPLOAD_DIR = os.getenv("SERVER_UPLOAD_DIR", "/data/audio")
@@ -27,5 +29,7 @@ SERVER_UPLOAD_DIR = os.getenv("SERVER_UPLOAD_DIR", "/data/audio")
 # 服务器公网访问 URL 前缀（如：http://你的服务器IP或域名/audio）
 PUBLIC_URL_PREFIX = os.getenv("SERVER_PUBLIC_URL_PREFIX")
 
-# 历史记录文件路径（放在当前功能文件夹下）
-HISTORY_FILE = os.path.join(os.path.dirname(__file__), "upload_history.json")
+# 历史记录文件路径（放在当前功能文件夹下，JSONL 格式：每行一条记录）
+HISTORY_FILE = os.path.join(os.path.dirname(__file__), "upload_history.jsonl")
+# 旧版整文件 JSON 历史记录，首次使用时迁移为 JSONL
+LEGACY_HISTORY_FILE = os.path.join(os.path.dirname(__file__), "upload_history.json")
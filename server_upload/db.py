@@ -7,6 +7,7 @@ MySQL 数据库连接和操作模块
 
 import os
 import time
+import zlib
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
@@ -709,10 +710,8 @@ def get_files(limit=1000):
                 file_id = int(row_id) if row_id is not None else None
             else:
                 # 旧结构：id 是 VARCHAR（文件名），需要生成一个数字ID用于显示
-                # 使用行号作为临时ID，或者使用 hash
-                file_id = hash(str(row_id)) % 2147483647  # 转换为正数，避免负数
-                if file_id < 0:
-                    file_id = -file_id
+                # 用 crc32（非负且跨进程稳定；内置 hash() 每个进程随机化，重启后 ID 会变）
+                file_id = zlib.crc32(str(row_id).encode("utf-8")) % 2147483647
             
             result.append({
                 'id': file_id,  # ID（兼容新旧结构）
@@ -4,13 +4,143 @@
 历史记录管理模块
 
 提供历史记录的保存和加载功能（JSON 文件回退逻辑）。
+JSON 回退模式下历史记录为 JSONL 文件（每行一条，最新在后），新增/删除都只追加一行；
+内存中缓存最近 HISTORY_LIMIT 条记录，读取时不再解析整个文件。
 """
 
+import collections
+import itertools
 import os
 import json
+import secrets
+import threading
+import time
 from datetime import datetime
 from . import config
 
+# 安装了 orjson 时用它编码/解码历史记录（比标准库 json 快得多），否则回退到 json
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# JSON 历史记录最多保留条数
+HISTORY_LIMIT = 1000
+
+# JSON 回退模式下的内存历史记录（deque，最新在后），首次使用时从文件加载
+_history_cache = None
+# 内存记录对应的历史文件 (修改时间, 大小)，与文件不一致时重新加载
+_history_sig = None
+# 文件当前行数（含删除标记），超过 HISTORY_LIMIT 的两倍时压缩
+_line_count = 0
+_history_lock = threading.Lock()
+# 最近保存的记录 (文件名, 上传时间戳)，用于判断重复上传，不必读取历史记录
+_recent_uploads = collections.deque(maxlen=32)
+
+
+def _dumps_line(item):
+    """把一条记录编码为 JSONL 的一行（UTF-8 bytes，含换行符）"""
+    if HAS_ORJSON:
+        return orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    return (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+# 解析 JSON（str 或 UTF-8 bytes 均可）
+_loads = orjson.loads if HAS_ORJSON else json.loads
+
+
+def _migrate_legacy_history():
+    """
+    将旧版 upload_history.json（JSON 数组，最新在前）一次性转换为 JSONL（每行一条，最新在后）。
+    转换完成后旧文件重命名为 .bak 保留。
+    """
+    if os.path.exists(config.HISTORY_FILE) or not os.path.exists(config.LEGACY_HISTORY_FILE):
+        return
+    try:
+        with open(config.LEGACY_HISTORY_FILE, 'rb') as f:
+            records = _loads(f.read())
+        with open(config.HISTORY_FILE, 'wb') as f:
+            f.writelines(_dumps_line(r) for r in reversed(records))
+        os.replace(config.LEGACY_HISTORY_FILE, config.LEGACY_HISTORY_FILE + ".bak")
+        print(f"[server_upload.history] 已将 {len(records)} 条历史记录迁移到 {os.path.basename(config.HISTORY_FILE)}")
+    except Exception as e:
+        print(f"迁移历史记录失败: {e}")
+
+
+def _file_signature():
+    """历史文件的 (修改时间, 大小)，用于发现其他进程对文件的修改；文件不存在时返回 None"""
+    try:
+        st = os.stat(config.HISTORY_FILE)
+        return st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+
+def _json_history():
+    """
+    返回内存中的 JSON 历史记录（最新在后），首次调用或文件被其他进程修改后从文件加载（调用方需持有 _history_lock）
+    文件中的删除标记 {"deleted": id} 会让它之前的同 ID 记录失效
+    """
+    global _history_cache, _history_sig, _line_count
+    if _history_cache is None:
+        _migrate_legacy_history()
+    sig = _file_signature()
+    if _history_cache is None or sig != _history_sig:
+        lines = []
+        try:
+            with open(config.HISTORY_FILE, 'rb') as f:
+                lines = [line for line in f if line.strip()]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"加载历史记录失败: {e}")
+        
+        # 从最新往前扫描，遇到删除标记后跳过更早的同 ID 记录
+        records = []
+        deleted = set()
+        for line in reversed(lines):
+            try:
+                item = _loads(line)
+            except ValueError:
+                continue
+            if item.keys() == {"deleted"}:
+                deleted.add(str(item["deleted"]))
+            elif item.get("id") is None or str(item["id"]) not in deleted:
+                records.append(item)
+                if len(records) >= HISTORY_LIMIT:
+                    break
+        _history_cache = collections.deque(reversed(records), maxlen=HISTORY_LIMIT)
+        _history_sig = sig
+        _line_count = len(lines)
+    return _history_cache
+
+
+def _compact_history():
+    """用内存中的记录重写文件，去掉删除标记和超出保留条数的旧记录（调用方需持有 _history_lock）"""
+    global _history_sig, _line_count
+    tmp_file = config.HISTORY_FILE + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(b"".join(_dumps_line(r) for r in _history_cache))
+    os.replace(tmp_file, config.HISTORY_FILE)
+    _line_count = len(_history_cache)
+    _history_sig = _file_signature()
+
+
+def _append_line(item):
+    """向 JSONL 文件追加一行（一次 write），文件行数过多时压缩（调用方需持有 _history_lock）"""
+    global _history_sig, _line_count
+    try:
+        os.makedirs(os.path.dirname(config.HISTORY_FILE), exist_ok=True)
+        with open(config.HISTORY_FILE, 'ab') as f:
+            f.write(_dumps_line(item))
+        _line_count += 1
+        _history_sig = _file_signature()
+        if _line_count > HISTORY_LIMIT * 2:
+            _compact_history()
+    except Exception as e:
+        print(f"[server_upload.history] 写入历史记录文件失败: {e}")
+
 
 def save_history_record(record):
     """
@@ -33,40 +163,34 @@ def save_history_record(record):
     except Exception as e:
         print(f"[server_upload.history] 保存到数据库失败，回退到 JSON 文件: {e}")
     
-    # 回退到 JSON 文件（兼容旧代码）
-    # 确保目录存在
-    os.makedirs(os.path.dirname(config.HISTORY_FILE), exist_ok=True)
-    
-    # 读取现有记录（加载所有记录用于去重检查）
-    history = load_history(limit=10000)  # 加载所有记录用于去重
-    
+    # 回退到 JSON 文件（兼容旧代码）：追加一行到 JSONL 文件
     # 检查是否已存在相同记录（根据文件名和上传时间判断，避免重复）
-    # 如果最近1秒内有相同文件名的记录，认为是重复上传，不添加
-    record_time = datetime.strptime(record['upload_time'], "%Y-%m-%d %H:%M:%S")
-    is_duplicate = False
-    for existing_record in history[:5]:  # 只检查最近5条记录
-        if existing_record.get('file_name') == record['file_name']:
-            try:
-                existing_time = datetime.strptime(existing_record.get('upload_time', ''), "%Y-%m-%d %H:%M:%S")
-                time_diff = abs((record_time - existing_time).total_seconds())
-                if time_diff < 2:  # 2秒内的相同文件名记录认为是重复
-                    is_duplicate = True
-                    break
-            except:
-                pass
-    
-    # 如果不是重复记录，才添加
-    if not is_duplicate:
-        # 添加新记录（插入到开头）
-        history.insert(0, record)
-    
-    # 限制记录数量（最多保留 1000 条）
-    if len(history) > 1000:
-        history = history[:1000]
-    
-    # 保存到文件
-    with open(config.HISTORY_FILE, 'w', encoding='utf-8') as f:
-        json.dump(history, f, indent=2, ensure_ascii=False)
+    # 如果最近2秒内有相同文件名的记录，认为是重复上传，不添加
+    record_time = datetime.strptime(record['upload_time'], "%Y-%m-%d %H:%M:%S").timestamp()
+    with _history_lock:
+        for file_name, upload_time in _recent_uploads:
+            if file_name == record['file_name'] and abs(record_time - upload_time) < 2:
+                return
+        _recent_uploads.append((record['file_name'], record_time))
+        
+        # 没有数据库自增 ID 时生成一个：上传时间 + 随机后缀（同一秒内 65536 种取值）
+        if record.get('id') is None:
+            record['id'] = f"{time.strftime('%Y%m%d%H%M%S', time.localtime(record_time))}_{secrets.token_hex(2)}"
+        
+        # 添加新记录，内存中最多保留 HISTORY_LIMIT 条
+        _json_history().append(record)
+        _append_line(record)
+
+
+def delete_history_record(record_id):
+    """从 JSON 历史记录中删除指定 ID 的记录（文件中追加一条删除标记，压缩时才真正移除）"""
+    with _history_lock:
+        history = _json_history()
+        remaining = [r for r in history if str(r.get("id")) != str(record_id)]
+        if len(remaining) != len(history):
+            history.clear()
+            history.extend(remaining)
+            _append_line({"deleted": record_id})
 
 
 def load_history(limit=100):
@@ -89,15 +213,6 @@ def load_history(limit=100):
     except Exception as e:
         print(f"[server_upload.history] 从数据库读取失败，回退到 JSON 文件: {e}")
     
-    # 回退到 JSON 文件（兼容旧代码）
-    if not os.path.exists(config.HISTORY_FILE):
-        return []
-    
-    try:
-        with open(config.HISTORY_FILE, 'r', encoding='utf-8') as f:
-            history = json.load(f)
-        # 返回最新的 limit 条记录
-        return history[:limit]
-    except Exception as e:
-        print(f"加载历史记录失败: {e}")
-        return []
+    # 回退到 JSON 文件（兼容旧代码），返回最新的 limit 条记录（最新在前）
+    with _history_lock:
+        return list(itertools.islice(reversed(_json_history()), limit))
@@ -157,9 +157,12 @@ def _save_cache_to_file():
             except Exception as e:
                 print(f"[ServerFilesCache] 保存到 MySQL 失败，回退到文件: {e}")
         
-        # 回退到 JSON 文件
-        with CACHE_FILE.open("w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # 回退到 JSON 文件：一次编码、一次写入临时文件，再原子替换（读取方不会读到写了一半的文件）
+        payload = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+        tmp_file = CACHE_FILE.with_suffix(".json.tmp")
+        with tmp_file.open("wb") as f:
+            f.write(payload)
+        tmp_file.replace(CACHE_FILE)
         print(f"[ServerFilesCache] 已保存到文件")
     except Exception as e:
         print(f"[ServerFilesCache] 保存缓存失败: {e}")
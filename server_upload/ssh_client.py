@@ -6,9 +6,43 @@ SSH 客户端模块
 提供 SSH 连接和 SFTP 操作的封装。
 """
 
+import functools
+import hashlib
+import shlex
+import threading
+import time
+from contextlib import contextmanager
+
 import paramiko
 from . import config
 
+# SSH 通道窗口大小（新打开的 SFTP 通道使用）
+TRANSPORT_WINDOW_SIZE = 134217727
+
+# 连接池中空闲连接的最长保留时间（秒），超时后由后台线程关闭
+POOL_IDLE_TIMEOUT = 300
+# 后台清理空闲连接的检查间隔（秒）
+POOL_REAP_INTERVAL = 60
+
+# 空闲连接池 {连接参数: [(SSHClient, 最后使用时间), ...]}
+_IDLE_CONNS = {}
+_POOL_LOCK = threading.Lock()
+_REAPER = None
+
+
+@functools.lru_cache(maxsize=None)
+def load_private_key(key_path):
+    """
+    读取并解析 SSH 私钥，每个路径在进程内只解析一次
+    依次尝试 Ed25519、ECDSA、RSA 格式，都无法解析时抛出 paramiko.SSHException
+    """
+    for key_class in (paramiko.Ed25519Key, paramiko.ECDSAKey, paramiko.RSAKey):
+        try:
+            return key_class.from_private_key_file(key_path)
+        except paramiko.SSHException:
+            continue
+    raise paramiko.SSHException(f"无法解析私钥文件: {key_path}")
+
 
 class SSHClient:
     """SSH 客户端封装类"""
@@ -16,6 +50,8 @@ class SSHClient:
     def __init__(self):
         self.ssh = None
         self.sftp = None
+        # 本连接上已确认存在的远程目录，避免每次上传都执行 mkdir -p
+        self.known_dirs = set()
     
     def connect(self):
         """
@@ -33,7 +69,7 @@ class SSHClient:
         self.ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         
         if config.SERVER_KEY_PATH:
-            private_key = paramiko.RSAKey.from_private_key_file(config.SERVER_KEY_PATH)
+            private_key = load_private_key(config.SERVER_KEY_PATH)
             self.ssh.connect(
                 hostname=config.SERVER_HOST,
                 port=config.SERVER_PORT,
@@ -47,14 +83,32 @@ class SSHClient:
                 username=config.SERVER_USER,
                 password=config.SERVER_PASSWORD
             )
+        
+        # 默认通道窗口较小，长距离链路上 SFTP 吞吐受限；调大窗口，并避免大文件传输中途重新密钥协商
+        transport = self.ssh.get_transport()
+        transport.default_window_size = TRANSPORT_WINDOW_SIZE
+        transport.packetizer.REKEY_BYTES = pow(2, 40)
+        transport.packetizer.REKEY_PACKETS = pow(2, 40)
     
     def open_sftp(self):
-        """打开 SFTP 连接"""
+        """打开 SFTP 连接（已打开且可用时直接复用）"""
         if not self.ssh:
             raise RuntimeError("请先调用 connect() 连接服务器")
-        self.sftp = self.ssh.open_sftp()
+        if self.sftp is None or self.sftp.sock.closed:
+            self.sftp = self.ssh.open_sftp()
         return self.sftp
     
+    def is_active(self):
+        """连接是否仍然可用（发送一个 ignore 包探测）"""
+        transport = self.ssh.get_transport() if self.ssh else None
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            transport.send_ignore()
+            return True
+        except Exception:
+            return False
+    
     def exec_command(self, command):
         """
         执行远程命令
@@ -69,6 +123,14 @@ class SSHClient:
             raise RuntimeError("请先调用 connect() 连接服务器")
         return self.ssh.exec_command(command)
     
+    def ensure_dir(self, remote_dir):
+        """确保远程目录存在（每个连接上同一目录只执行一次 mkdir -p）"""
+        if remote_dir in self.known_dirs:
+            return
+        stdin, stdout, stderr = self.exec_command(f"mkdir -p {shlex.quote(remote_dir)}")
+        if stdout.channel.recv_exit_status() == 0:
+            self.known_dirs.add(remote_dir)
+    
     def close(self):
         """关闭连接"""
         if self.sftp:
@@ -94,3 +156,70 @@ class SSHClient:
         """上下文管理器出口"""
         self.close()
         return False
+
+
+def _pool_key():
+    """连接池的键：服务器地址、用户和认证信息（密码只保存哈希）"""
+    password_hash = hashlib.sha256((config.SERVER_PASSWORD or "").encode("utf-8")).hexdigest()
+    return (config.SERVER_HOST, config.SERVER_PORT, config.SERVER_USER, config.SERVER_KEY_PATH, password_hash)
+
+
+def _reap_idle_connections():
+    """后台线程：定期关闭空闲超过 POOL_IDLE_TIMEOUT 的连接"""
+    while True:
+        time.sleep(POOL_REAP_INTERVAL)
+        expired = []
+        now = time.time()
+        with _POOL_LOCK:
+            for key, conns in _IDLE_CONNS.items():
+                keep = []
+                for client, last_used in conns:
+                    (expired if now - last_used > POOL_IDLE_TIMEOUT else keep).append((client, last_used))
+                _IDLE_CONNS[key] = keep
+        for client, _ in expired:
+            client.close()
+
+
+def _acquire(key):
+    """从连接池取出一个可用连接，没有则新建"""
+    while True:
+        with _POOL_LOCK:
+            conns = _IDLE_CONNS.get(key)
+            client = conns.pop()[0] if conns else None
+        if client is None:
+            client = SSHClient()
+            client.connect()
+            return client
+        if client.is_active():
+            return client
+        # 连接已断开（服务器重启、网络中断等），丢弃后继续取
+        client.close()
+
+
+def _release(key, client):
+    """用完的连接放回连接池，并确保后台清理线程已启动"""
+    global _REAPER
+    with _POOL_LOCK:
+        _IDLE_CONNS.setdefault(key, []).append((client, time.time()))
+        if _REAPER is None:
+            _REAPER = threading.Thread(target=_reap_idle_connections, daemon=True)
+            _REAPER.start()
+
+
+@contextmanager
+def pooled_connection():
+    """
+    从连接池获取一个已连接的 SSHClient，用完自动归还；出错时关闭该连接而不归还
+
+    用法:
+        with pooled_connection() as ssh_client:
+            sftp = ssh_client.open_sftp()
+    """
+    key = _pool_key()
+    client = _acquire(key)
+    try:
+        yield client
+    except BaseException:
+        client.close()
+        raise
+    _release(key, client)
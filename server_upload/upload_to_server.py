@@ -6,6 +6,7 @@
 """
 
 import os
+import shlex
 import sys
 import paramiko
 from pathlib import Path
@@ -28,14 +29,155 @@ SERVER_UPLOAD_DIR = os.getenv("SERVER_UPLOAD_DIR", "/data/audio")
 # 服务器公网访问 URL 前缀
 PUBLIC_URL_PREFIX = os.getenv("SERVER_PUBLIC_URL_PREFIX")
 
+# SFTP 通道窗口和最大包大小（paramiko 默认 2MB / 32KB，长距离链路上会限制吞吐）
+SFTP_WINDOW_SIZE = 2 ** 27
+SFTP_MAX_PACKET_SIZE = 2 ** 15
 
-def upload_file_scp(local_file_path, remote_filename=None):
+# 已确认存在的远程目录 {(主机, 目录)}，避免每次连接都执行 mkdir -p
+_ENSURED_DIRS = set()
+
+
+class ServerUploader:
+    """
+    复用同一个 SSH/SFTP 连接批量上传文件到服务器：
+    连接、认证、创建目录只做一次，chmod 在关闭时一次性执行
+
+    用法:
+        with ServerUploader() as uploader:
+            for path in files:
+                url = uploader.upload(path)
     """
-    通过 SCP 上传文件到服务器
+
+    def __init__(self):
+        print(f"正在连接到服务器: {SERVER_HOST}:{SERVER_PORT}")
+        print(f"用户: {SERVER_USER}")
+
+        # 创建 SSH 客户端
+        self.ssh = paramiko.SSHClient()
+        self.ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.sftp = None
+        self._uploaded = []
+
+        try:
+            # 连接服务器
+            if SERVER_KEY_PATH:
+                # 使用密钥认证
+                private_key = paramiko.RSAKey.from_private_key_file(SERVER_KEY_PATH)
+                self.ssh.connect(
+                    hostname=SERVER_HOST,
+                    port=SERVER_PORT,
+                    username=SERVER_USER,
+                    pkey=private_key
+                )
+            else:
+                # 使用密码认证
+                if SERVER_PASSWORD is None:
+                    raise ValueError("需要设置 SERVER_PASSWORD 或 SERVER_KEY_PATH")
+                self.ssh.connect(
+                    hostname=SERVER_HOST,
+                    port=SERVER_PORT,
+                    username=SERVER_USER,
+                    password=SERVER_PASSWORD
+                )
+
+            print("✅ 连接成功！")
+
+            # 创建远程目录（如果不存在），本进程内每个目录只需确认一次
+            if (SERVER_HOST, SERVER_UPLOAD_DIR) not in _ENSURED_DIRS:
+                print(f"检查远程目录: {SERVER_UPLOAD_DIR}")
+                stdin, stdout, stderr = self.ssh.exec_command(f"mkdir -p {shlex.quote(SERVER_UPLOAD_DIR)}")
+                if stdout.channel.recv_exit_status() == 0:  # 等待命令执行完成
+                    _ENSURED_DIRS.add((SERVER_HOST, SERVER_UPLOAD_DIR))
+
+            # 大文件传输时避免中途重新密钥协商（默认约每 1GB 一次，期间传输会停顿）
+            transport = self.ssh.get_transport()
+            transport.packetizer.REKEY_BYTES = pow(2, 40)
+            transport.packetizer.REKEY_PACKETS = pow(2, 40)
+            # 使用更大的 SFTP 通道窗口，允许更多数据同时在途
+            self.sftp = paramiko.SFTPClient.from_transport(
+                transport,
+                window_size=SFTP_WINDOW_SIZE,
+                max_packet_size=SFTP_MAX_PACKET_SIZE,
+            )
+        except Exception:
+            self.ssh.close()
+            raise
+
+    def upload(self, local_file_path, remote_filename=None, force=False):
+        """
+        上传一个文件；服务器上已有同名且大小相同的文件时跳过传输
+
+        Args:
+            local_file_path: 本地文件路径
+            remote_filename: 服务器上的文件名（可选，默认使用原文件名）
+            force: 为 True 时不检查远程文件，总是重新上传
+
+        Returns:
+            str: 文件的公网访问 URL
+        """
+        if not os.path.exists(local_file_path):
+            raise FileNotFoundError(f"文件不存在: {local_file_path}")
+
+        if remote_filename is None:
+            remote_filename = os.path.basename(local_file_path)
+
+        # 远程文件路径
+        remote_file_path = f"{SERVER_UPLOAD_DIR}/{remote_filename}"
+        print(f"本地文件: {local_file_path}")
+        print(f"远程路径: {remote_file_path}")
+
+        # 生成公网 URL
+        public_url = f"{PUBLIC_URL_PREFIX}/{remote_filename}"
+        file_size = os.path.getsize(local_file_path)
+
+        # 远程已有大小相同的文件时不再重复传输（一次 STAT 请求）
+        if not force:
+            try:
+                if self.sftp.stat(remote_file_path).st_size == file_size:
+                    print(f"✅ 服务器上已存在相同大小的文件，跳过上传")
+                    print(f"✅ 公网 URL: {public_url}")
+                    return public_url
+            except IOError:
+                pass
+
+        print("正在上传文件...")
+        # putfo 内部使用流水线写入（不逐块等待服务器确认），confirm 时校验远端大小
+        with open(local_file_path, "rb") as fh:
+            self.sftp.putfo(fh, remote_file_path, file_size=file_size, confirm=True)
+        self._uploaded.append(remote_file_path)
+        print(f"✅ 上传成功！")
+        print(f"✅ 公网 URL: {public_url}")
+        return public_url
+
+    def close(self):
+        """为本次上传的所有文件统一设置权限（确保 Web 服务器可以访问），然后关闭连接"""
+        try:
+            if self._uploaded:
+                print("设置文件权限...")
+                paths = " ".join(shlex.quote(p) for p in self._uploaded)
+                stdin, stdout, stderr = self.ssh.exec_command(f"chmod 644 {paths}")
+                stdout.channel.recv_exit_status()
+                self._uploaded = []
+        finally:
+            if self.sftp:
+                self.sftp.close()
+            self.ssh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def upload_file_scp(local_file_path, remote_filename=None, force=False):
+    """
+    通过 SCP 上传文件到服务器（单个文件；批量上传请使用 ServerUploader 复用连接）
     
     Args:
         local_file_path: 本地文件路径
         remote_filename: 服务器上的文件名（可选，默认使用原文件名）
+        force: 为 True 时即使服务器上已有相同大小的文件也重新上传
     
     Returns:
         str: 文件的公网访问 URL
@@ -43,82 +185,25 @@ def upload_file_scp(local_file_path, remote_filename=None):
     if not os.path.exists(local_file_path):
         raise FileNotFoundError(f"文件不存在: {local_file_path}")
     
-    if remote_filename is None:
-        remote_filename = os.path.basename(local_file_path)
-    
-    # 远程文件路径
-    remote_file_path = f"{SERVER_UPLOAD_DIR}/{remote_filename}"
-    
-    print(f"正在连接到服务器: {SERVER_HOST}:{SERVER_PORT}")
-    print(f"用户: {SERVER_USER}")
-    print(f"本地文件: {local_file_path}")
-    print(f"远程路径: {remote_file_path}")
-    
-    # 创建 SSH 客户端
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    
     try:
-        # 连接服务器
-        if SERVER_KEY_PATH:
-            # 使用密钥认证
-            private_key = paramiko.RSAKey.from_private_key_file(SERVER_KEY_PATH)
-            ssh.connect(
-                hostname=SERVER_HOST,
-                port=SERVER_PORT,
-                username=SERVER_USER,
-                pkey=private_key
-            )
-        else:
-            # 使用密码认证
-            if SERVER_PASSWORD is None:
-                raise ValueError("需要设置 SERVER_PASSWORD 或 SERVER_KEY_PATH")
-            ssh.connect(
-                hostname=SERVER_HOST,
-                port=SERVER_PORT,
-                username=SERVER_USER,
-                password=SERVER_PASSWORD
-            )
-        
-        print("✅ 连接成功！")
-        
-        # 创建远程目录（如果不存在）
-        print(f"检查远程目录: {SERVER_UPLOAD_DIR}")
-        stdin, stdout, stderr = ssh.exec_command(f"mkdir -p {SERVER_UPLOAD_DIR}")
-        stdout.channel.recv_exit_status()  # 等待命令执行完成
-        
-        # 使用 SFTP 上传文件
-        print("正在上传文件...")
-        sftp = ssh.open_sftp()
-        sftp.put(local_file_path, remote_file_path)
-        sftp.close()
-        
-        print(f"✅ 上传成功！")
-        
-        # 设置文件权限（确保 Web 服务器可以访问）
-        print("设置文件权限...")
-        ssh.exec_command(f"chmod 644 {remote_file_path}")
-        
-        # 生成公网 URL
-        public_url = f"{PUBLIC_URL_PREFIX}/{remote_filename}"
-        print(f"✅ 公网 URL: {public_url}")
-        
-        return public_url
-        
+        with ServerUploader() as uploader:
+            return uploader.upload(local_file_path, remote_filename, force=force)
     except Exception as e:
         print(f"❌ 上传失败: {str(e)}")
         raise
-    finally:
-        ssh.close()
 
 
 def main():
     """主函数"""
-    if len(sys.argv) < 2:
-        print("使用方法: python upload_to_server.py <本地文件路径> [远程文件名]")
+    # --force: 服务器上已有相同大小的文件时也重新上传
+    args = [a for a in sys.argv[1:] if a != "--force"]
+    force = len(args) != len(sys.argv) - 1
+    if len(args) < 1:
+        print("使用方法: python upload_to_server.py <本地文件路径> [远程文件名] [--force]")
         print("\n示例:")
         print("  python upload_to_server.py /path/to/audio.wav")
         print("  python upload_to_server.py /path/to/audio.wav my_audio.wav")
+        print("  python upload_to_server.py /path/to/audio.wav --force  # 强制重新上传")
         print("\n⚠️  使用前请先配置脚本中的服务器信息：")
         print("  - SERVER_HOST: 服务器 IP 或域名")
         print("  - SERVER_USER: SSH 用户名")
@@ -127,8 +212,8 @@ def main():
         print("  - PUBLIC_URL_PREFIX: 公网访问 URL 前缀")
         sys.exit(1)
     
-    local_file = sys.argv[1]
-    remote_filename = sys.argv[2] if len(sys.argv) > 2 else None
+    local_file = args[0]
+    remote_filename = args[1] if len(args) > 1 else None
     
     # 检查配置
     if SERVER_HOST == "你的服务器IP或域名":
@@ -142,7 +227,7 @@ def main():
         sys.exit(1)
     
     try:
-        public_url = upload_file_scp(local_file, remote_filename)
+        public_url = upload_file_scp(local_file, remote_filename, force=force)
         print("\n" + "=" * 60)
         print("✅ 上传成功！")
         print("=" * 60)
@@ -15,15 +15,17 @@
 """
 
 import os
+import shutil
+import subprocess
 import time
 from datetime import datetime
 from . import config
 from . import utils
 from . import history
-from .ssh_client import SSHClient
+from .ssh_client import pooled_connection
 
 # 为了保持向后兼容，导出这些函数和变量
-from .file_operations import list_server_files, delete_server_file_by_id
+from .file_operations import list_server_files, delete_server_file_by_id, delete_server_files_by_ids
 from .history import load_history, save_history_record
 
 # 导出配置变量（保持向后兼容）
@@ -44,6 +46,32 @@ parse_duration_from_filename = utils.parse_duration_from_filename
 format_duration = utils.format_duration
 
 
+# SFTP 写入分块大小（超过 paramiko 单包上限会被拆分，吞吐急剧下降）
+SFTP_CHUNK_SIZE = 32768
+
+
+def _scp_enabled():
+    """是否使用系统 scp 上传：需开启 SERVER_UPLOAD_USE_SCP、配置私钥且已安装 scp"""
+    return config.USE_SCP and bool(config.SERVER_KEY_PATH) and shutil.which("scp") is not None
+
+
+def _upload_via_scp(local_file_path, remote_file_path):
+    """用 OpenSSH scp 上传文件（比 paramiko SFTP 吞吐高得多），失败时抛出 CalledProcessError"""
+    subprocess.run(
+        [
+            "scp", "-B", "-q",
+            "-o", "StrictHostKeyChecking=accept-new",
+            "-P", str(config.SERVER_PORT),
+            "-i", config.SERVER_KEY_PATH,
+            local_file_path,
+            f"{config.SERVER_USER}@{config.SERVER_HOST}:{remote_file_path}",
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+
+
 def upload_file_to_server(local_file_path, remote_filename=None, log_callback=None, uploader_ip=None, original_name=None, record_id=None):
     """
     上传文件到服务器
@@ -84,7 +112,10 @@ def upload_file_to_server(local_file_path, remote_filename=None, log_callback=No
     if not (config.SERVER_PASSWORD or config.SERVER_KEY_PATH):
         raise ValueError("需要配置 SERVER_UPLOAD_PASSWORD 或 SERVER_UPLOAD_KEY_PATH 才能连接服务器")
 
-    if not os.path.exists(local_file_path):
+    # 只 stat 一次：既判断文件是否存在，也提供文件大小和时长缓存的键
+    try:
+        st = os.stat(local_file_path)
+    except FileNotFoundError:
         raise FileNotFoundError(f"文件不存在: {local_file_path}")
     
     # 如果前端单独传了原始文件名（如 zhou.mp3），优先使用该名称作为"原文件中文名称"
@@ -99,16 +130,19 @@ def upload_file_to_server(local_file_path, remote_filename=None, log_callback=No
     
     # 获取文件信息
     log("[上传] 正在获取文件信息...")
-    file_size = os.path.getsize(local_file_path)
+    file_size = st.st_size
     log(f"[上传] 文件大小: {round(file_size / (1024 * 1024), 2)} MB")
     
     log("[上传] 正在获取音频时长...")
-    file_duration = utils.get_audio_duration(local_file_path)
+    file_duration = utils.get_audio_duration(local_file_path, st)
     if file_duration > 0:
         log(f"[上传] 音频时长: {utils.format_duration(file_duration)}")
     else:
         log("[上传] 警告: 无法获取音频时长，将使用默认值")
     
+    # 只取一次当前时间，文件名中的时间戳和历史记录的上传时间保持一致
+    now = datetime.now()
+    
     # 如果未指定远程文件名，则自动生成：文件名拼音_录音时长_时间戳
     if remote_filename is None:
         log("[上传] 正在生成新文件名...")
@@ -118,7 +152,7 @@ def upload_file_to_server(local_file_path, remote_filename=None, log_callback=No
         # 格式化时长
         duration_str = utils.format_duration_for_filename(file_duration)
         # 生成时间戳（格式：YYYYMMDDHHMMSS）
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        timestamp = now.strftime("%Y%m%d%H%M%S")
         # 获取原文件扩展名
         file_ext = os.path.splitext(local_file_path)[1] or '.mp3'
         # 组合新文件名：文件名拼音_录音时长_时间戳.扩展名
@@ -128,34 +162,41 @@ def upload_file_to_server(local_file_path, remote_filename=None, log_callback=No
     # 远程文件路径
     remote_file_path = f"{config.SERVER_UPLOAD_DIR}/{remote_filename}"
     
-    # 创建 SSH 客户端
     log(f"[上传] 正在连接服务器 {config.SERVER_HOST}:{config.SERVER_PORT}...")
-    ssh_client = SSHClient()
-    
     try:
-        # 连接服务器
-        ssh_client.connect()
-        log("[上传] 服务器连接成功")
-        
-        # 创建远程目录
-        log(f"[上传] 正在创建远程目录: {config.SERVER_UPLOAD_DIR}")
-        ssh_client.exec_command(f"mkdir -p {config.SERVER_UPLOAD_DIR}")
-        
-        # 使用 SFTP 上传文件
-        log(f"[上传] 开始上传文件到服务器...")
-        log(f"[上传] 本地路径: {local_file_path}")
-        log(f"[上传] 远程路径: {remote_file_path}")
-        sftp = ssh_client.open_sftp()
-        
-        # paramiko 的 put 方法不支持进度回调，所以我们用另一种方式
-        # 先上传，然后显示完成信息
-        sftp.put(local_file_path, remote_file_path)
-        log(f"[上传] 文件上传完成 ({round(file_size / (1024 * 1024), 2)} MB)")
-        sftp.close()
-        
-        # 设置文件权限（确保 web 服务器可以访问）
-        log("[上传] 正在设置文件权限...")
-        ssh_client.exec_command(f"chmod 644 {remote_file_path}")
+        # 复用连接池中的 SSH/SFTP 连接，避免每次上传都重新握手认证
+        with pooled_connection() as ssh_client:
+            log("[上传] 服务器连接成功")
+            
+            # 创建远程目录
+            log(f"[上传] 正在创建远程目录: {config.SERVER_UPLOAD_DIR}")
+            ssh_client.ensure_dir(config.SERVER_UPLOAD_DIR)
+            
+            # 使用 SFTP 上传文件
+            log(f"[上传] 开始上传文件到服务器...")
+            log(f"[上传] 本地路径: {local_file_path}")
+            log(f"[上传] 远程路径: {remote_file_path}")
+            uploaded = False
+            if _scp_enabled():
+                log("[上传] 使用 scp 上传")
+                try:
+                    _upload_via_scp(local_file_path, remote_file_path)
+                    uploaded = True
+                except subprocess.CalledProcessError as e:
+                    log(f"[上传] scp 上传失败，改用 SFTP: {(e.stderr or b'').decode(errors='replace').strip()}")
+            sftp = ssh_client.open_sftp()
+            if not uploaded:
+                # 流水线写入：不逐块等待服务器确认，按 32KB 分块（不超过 SFTP 单包大小）
+                # 传 memoryview 给 write，paramiko 内部切片时不再复制 bytes
+                with open(local_file_path, "rb", buffering=0) as src, sftp.open(remote_file_path, "wb") as dst:
+                    dst.set_pipelined(True)
+                    while buf := src.read(SFTP_CHUNK_SIZE):
+                        dst.write(memoryview(buf))
+            log(f"[上传] 文件上传完成 ({round(file_size / (1024 * 1024), 2)} MB)")
+            
+            # 设置文件权限（确保 web 服务器可以访问），复用已打开的 SFTP 通道，不再新开 exec 会话
+            log("[上传] 正在设置文件权限...")
+            sftp.chmod(remote_file_path, 0o644)
         
         # 生成公网 URL
         # 注意：如果服务器配置了 nginx，需要确保 nginx 配置了 /data/audio 目录的访问
@@ -175,7 +216,7 @@ def upload_file_to_server(local_file_path, remote_filename=None, log_callback=No
             "id": record_id,  # 如果传入了 record_id，使用它；否则稍后生成
             "file_name": remote_filename,
             "original_name": orig_display_name,  # 上传前的中文名称（浏览器里选择的原始文件名）
-            "upload_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),  # 上传时间
+            "upload_time": now.strftime("%Y-%m-%d %H:%M:%S"),  # 上传时间
             "upload_duration": upload_duration,  # 上传耗时（秒）
             "uploader_ip": uploader_ip or "",  # 操作人IP地址
             "file_size": file_size,
@@ -258,5 +299,3 @@ def upload_file_to_server(local_file_path, remote_filename=None, log_callback=No
             "success": False,
             "error": str(e)
         }
-    finally:
-        ssh_client.close()
@@ -6,9 +6,12 @@
 包含文件名处理、时长格式化、音频时长获取等工具函数。
 """
 
+import functools
+import json
 import os
 import re
 import subprocess
+import wave
 
 # 尝试导入 pypinyin，如果没有安装则使用备用方案
 try:
@@ -18,30 +21,68 @@ except ImportError:
     HAS_PYPINYIN = False
     print("[server_upload.utils] 警告：未安装 pypinyin 库，文件名拼音转换功能将不可用。请运行: pip install pypinyin")
 
+# PyAV（faster-whisper 的依赖）可在进程内读取容器头部获取时长，没有时回退到 ffprobe
+try:
+    import av
+    HAS_PYAV = True
+except ImportError:
+    HAS_PYAV = False
+
+
+def _header_duration(abs_path):
+    """在进程内解析文件头获取时长（秒），WAV 用标准库 wave，其余格式用 PyAV；取不到返回 None"""
+    if abs_path.lower().endswith('.wav'):
+        try:
+            with wave.open(abs_path, 'rb') as w:
+                return w.getnframes() / w.getframerate()
+        except (wave.Error, EOFError):
+            pass  # 非 PCM 的 WAV（如 float/压缩编码），交给 PyAV
+    if HAS_PYAV:
+        try:
+            with av.open(abs_path) as container:
+                if container.duration:
+                    return container.duration / av.time_base
+        except av.error.FFmpegError:
+            pass
+    return None
+
+
+@functools.lru_cache(maxsize=1024)
+def _probe_duration(abs_path, mtime_ns, size):
+    """
+    读取音频时长（秒），按 (路径, 修改时间, 大小) 缓存，文件变化后自动失效
+    优先在进程内解析文件头，取不到时才启动 ffprobe 子进程；失败时抛出异常（不缓存失败结果）
+    """
+    duration = _header_duration(abs_path)
+    if duration is not None:
+        return duration
+    
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-show_entries', 'format=duration',
+        '-print_format', 'json',
+        abs_path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=10, check=True)
+    return float(json.loads(result.stdout)['format']['duration'])
+
 
-def get_audio_duration(file_path):
+def get_audio_duration(file_path, st=None):
     """
     获取音频文件时长（秒）
     
     Args:
         file_path: 音频文件路径
+        st: 调用方已取得的 os.stat 结果（可选，避免重复 stat）
     
     Returns:
         float: 时长（秒），失败返回 0
     """
     try:
-        # 使用 ffprobe 获取时长
-        cmd = [
-            'ffprobe',
-            '-v', 'error',
-            '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            file_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
-            duration = float(result.stdout.strip())
-            return duration
+        if st is None:
+            st = os.stat(file_path)
+        return _probe_duration(os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
     except Exception as e:
         print(f"获取音频时长失败: {e}")
     return 0
@@ -1,13 +1,28 @@
+import collections
+import functools
 import locale
 import os
+import queue
 import sys
+import threading
 import torch
 import re
 ROOT_DIR = os.getcwd()
 from opencc import OpenCC
 
 def parse_ini(file=os.path.join(ROOT_DIR,'set.ini')):
-    
+    """读取 set.ini 配置；按文件的 (修改时间, 大小) 缓存解析结果，文件修改后自动重新解析"""
+    try:
+        st = os.stat(file)
+        sig = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        sig = None
+    # 返回副本，调用方修改不影响缓存
+    return dict(_parse_ini_file(file, sig))
+
+
+@functools.lru_cache(maxsize=4)
+def _parse_ini_file(file, sig):
     lang="zh"
     try:
         lang="en" if locale.getdefaultlocale()[0].split('_')[0].lower() != 'zh' else "zh"
@@ -17,7 +32,12 @@ def parse_ini(file=os.path.join(ROOT_DIR,'set.ini')):
         "web_address":"127.0.0.1:9977", 
         "lang":lang, 
         "devtype":"cpu", 
-        "cuda_com_type":"float32",
+        "compute_type":"",
+        "batch_size":0,
+        "model_workers":0,
+        "preload_models":"",
+        "preload_diarization":False,
+        "model_cache_mb":0,
         "beam_size":5,
         "best_of":5,
         "vad":True,
@@ -49,6 +69,80 @@ def parse_ini(file=os.path.join(ROOT_DIR,'set.ini')):
         sets["initial_prompt_zh"] = "转录为中文繁体。"
     return sets
 
+# CUDA 上按优先顺序选择显卡支持的计算精度：有 Tensor Core（计算能力 ≥ 7.0）的显卡支持 int8_float16，较老的显卡退回 float16 等
+CUDA_COMPUTE_TYPES = ('int8_float16', 'float16', 'int8', 'float32')
+
+
+@functools.lru_cache(maxsize=None)
+def _cuda_compute_type():
+    """当前显卡支持的最快计算精度（由 CTranslate2 按显卡计算能力判断），无法判断时使用 int8_float16"""
+    try:
+        import ctranslate2
+        supported = ctranslate2.get_supported_compute_types('cuda')
+    except Exception:
+        return 'int8_float16'
+    for compute_type in CUDA_COMPUTE_TYPES:
+        if compute_type in supported:
+            return compute_type
+    return 'float32'
+
+
+def get_compute_type(sets):
+    """
+    faster-whisper 的计算精度：set.ini 中 compute_type 有值时使用该值，
+    否则 CPU 用 int8、CUDA 用显卡支持的最快精度（通常为 int8_float16：INT8 权重，显存和内存带宽减半；CUDA 需要 CUDA 12 + cuDNN）
+    旧配置项 cuda_com_type 已改名为 compute_type，CUDA 上仍作为备用读取
+    """
+    if sets.get('compute_type'):
+        return sets['compute_type']
+    if sets.get('devtype') == 'cpu':
+        return 'int8'
+    return sets.get('cuda_com_type') or _cuda_compute_type()
+
+
+# flash attention 只支持 float16 / bfloat16 计算精度
+FLASH_ATTENTION_COMPUTE_TYPES = ('float16', 'bfloat16')
+
+
+@functools.lru_cache(maxsize=None)
+def _cuda_supports_flash_attention():
+    """CTranslate2 ≥ 4.3 且显卡为 Ampere 及更新（计算能力 ≥ 8.0）时支持 flash attention"""
+    try:
+        import ctranslate2
+        version = tuple(int(x) for x in ctranslate2.__version__.split('.')[:2])
+        return version >= (4, 3) and torch.cuda.get_device_capability() >= (8, 0)
+    except Exception:
+        return False
+
+
+def use_flash_attention(sets):
+    """CUDA 上计算精度为 float16 / bfloat16 且显卡支持时启用 flash attention，减少注意力计算的显存读写"""
+    return (sets.get('devtype') == 'cuda'
+            and get_compute_type(sets) in FLASH_ATTENTION_COMPUTE_TYPES
+            and _cuda_supports_flash_attention())
+
+
+def get_batch_size(sets):
+    """批量推理每批的语音块数：set.ini 中 batch_size 有值时使用该值，否则 CUDA 用 8、CPU 用 4"""
+    return sets.get('batch_size') or (4 if sets.get('devtype') == 'cpu' else 8)
+
+
+def get_model_workers(sets):
+    """
+    每个模型可并行执行的转写数（ctranslate2 num_workers）：set.ini 中 model_workers 有值时使用该值，否则 CUDA 用 2、CPU 用 1
+    多个请求同时转写时各自的批次在 GPU 上并行执行，不再排队；同一设备上的工作线程共用模型权重
+    """
+    return sets.get('model_workers') or (1 if sets.get('devtype') == 'cpu' else 2)
+
+
+def get_preload_models(sets):
+    """启动时预加载并常驻内存的模型列表（set.ini 中 preload_models，逗号分隔，为空则不预加载）"""
+    models = sets.get('preload_models') or []
+    if isinstance(models, str):
+        models = [models]
+    return [m.strip() for m in models if m.strip()]
+
+
 sets=parse_ini()
 
 trans=sets.get('opencc')
@@ -62,7 +156,6 @@ LANG=sets.get('lang','zh')
 if LANG=='zh':
     os.environ['HF_ENDPOINT'] = 'https://hf-mirror.com'
 devtype=sets.get('devtype')
-cuda_com_type=sets.get('cuda_com_type')
 
 
 
@@ -70,8 +163,25 @@ MODEL_DIR = os.path.join(ROOT_DIR, 'models')
 STATIC_DIR = os.path.join(ROOT_DIR, 'static')
 TMP_DIR = os.path.join(STATIC_DIR, 'tmp')
 
-progressbar={}
-progressresult={}
+class TaskState:
+    """
+    单个识别任务的状态：progress 为进度（0~1），result 为结果（完成后为字幕，出错时为 'error:' 开头的字符串）。
+    后台线程更新后调用 notify()，SSE 推送接口等待 changed
+    """
+    __slots__ = ('progress', 'result', 'changed')
+
+    def __init__(self):
+        self.progress = 0
+        self.result = None
+        self.changed = threading.Event()
+
+    def notify(self):
+        """通知等待中的读取方：进度或结果已更新"""
+        self.changed.set()
+
+
+# 识别任务状态 {key: TaskState}；重新提交同一任务时整体替换为新对象，旧任务的更新不会影响新任务
+TASKS={}
 
 
 if not os.path.exists(TMP_DIR):
@@ -152,6 +262,96 @@ updatetips = ""
 transobj = langlist[LANG]
 lang_code=language_code_list[LANG]
 
-TASK_QUEUE= []
+# 识别任务队列：/process 放入任务，后台 shibie 线程阻塞等待取出
+TASK_QUEUE= queue.Queue()
+
+# 各 Whisper 模型的参数量（百万），用于估算模型占用的内存/显存
+# 按顺序匹配模型名称，更具体的名称放在前面（如 large-v3-turbo 先匹配 turbo）
+MODEL_PARAMS_M = {
+    "distil-whisper-small": 166, "distil-whisper-medium": 394, "distil-whisper-large": 756,
+    "turbo": 809, "tiny": 39, "base": 74, "small": 244, "medium": 769, "large": 1550,
+}
+# 未在 model_cache_mb 中配置时模型缓存的默认上限（MB）
+DEFAULT_MODEL_CACHE_MB = 4096
+
+
+def estimate_model_bytes(model, compute_type):
+    """按参数量 × 每个权重的字节数估算模型大小；未知模型按 large 估算"""
+    name = model.split('/')[-1].lower()
+    params_m = MODEL_PARAMS_M["large"]
+    for prefix, count in MODEL_PARAMS_M.items():
+        if prefix in name:
+            params_m = count
+            break
+    if compute_type.startswith('int8'):
+        bytes_per_weight = 1
+    elif compute_type in ('float16', 'bfloat16'):
+        bytes_per_weight = 2
+    else:
+        bytes_per_weight = 4
+    return params_m * 1000 * 1000 * bytes_per_weight
+
+
+def get_model_cache_bytes(sets):
+    """模型缓存上限（字节）：set.ini 中 model_cache_mb 有值时使用该值"""
+    return (sets.get('model_cache_mb') or DEFAULT_MODEL_CACHE_MB) * 1024 * 1024
+
+
+class ModelCache:
+    """
+    已加载模型的 LRU 缓存，键为 (模型名, compute_type, 设备, batch_size)。
+    按估算大小累计占用，放入新模型会超出上限时才卸载最久未用的模型；常驻（pinned）的模型不会被卸载
+    """
+
+    def __init__(self):
+        self._models = collections.OrderedDict()  # key -> (模型, 估算字节数, 是否常驻)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """取出模型并标记为最近使用，不存在时返回 None"""
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is None:
+                return None
+            self._models.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, model, nbytes, budget, pinned=False):
+        """放入模型，超出上限时先卸载最久未用的非常驻模型"""
+        with self._lock:
+            self._models.pop(key, None)
+            used = sum(entry[1] for entry in self._models.values())
+            evicted = 0
+            for old_key in list(self._models):
+                if used + nbytes <= budget:
+                    break
+                if self._models[old_key][2]:
+                    continue
+                used -= self._models.pop(old_key)[1]
+                evicted += 1
+                print(f'模型缓存超出上限，卸载模型 {old_key[0]}')
+            self._models[key] = (model, nbytes, pinned)
+        if evicted:
+            _empty_cuda_cache()
+
+    def clear(self, include_pinned=False):
+        """卸载缓存中的模型，返回卸载的数量"""
+        with self._lock:
+            keys = [k for k, entry in self._models.items() if include_pinned or not entry[2]]
+            for k in keys:
+                del self._models[k]
+        if keys:
+            _empty_cuda_cache()
+        return len(keys)
+
+
+def _empty_cuda_cache():
+    """释放 PyTorch 缓存的空闲显存"""
+    try:
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except Exception:
+        pass
+
 
-MODEL_DICT={}
+MODEL_DICT=ModelCache()
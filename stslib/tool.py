@@ -3,12 +3,16 @@ import sys
 import webbrowser
 from datetime import timedelta
 
+import numpy as np
 import requests
 import stslib
 from stslib import cfg
 
+# ffmpeg 解码音频使用的线程数（音频解码很轻，少量线程即可，避免并发请求时抢占 CPU）
+FFMPEG_DECODE_THREADS = 2
+
 def runffmpeg(arg):
-    cmd = ["ffmpeg","-hide_banner","-y"]
+    cmd = ["ffmpeg","-hide_banner","-nostdin","-y"]
     # if cfg.devtype =='cuda':
     #     cmd.extend(["-hwaccel", "cuda","-hwaccel_output_format","cuda"])
     cmd = cmd + arg
@@ -38,6 +42,29 @@ def runffmpeg(arg):
             #出错异常
             errs=f"[error]ffmpeg:error {cmd=},\n{str(e)}"
             return errs
+
+
+def ffmpeg_decode_audio(file_path, sampling_rate=16000, data=None, duration=None):
+    # 用 ffmpeg 把音频解码为单声道 PCM 并通过管道读入内存，返回 float32 数组（可直接传给 faster-whisper）
+    # 传入 data（音频文件内容）时从标准输入读取，file_path 应为 "pipe:0"；duration 为只解码开头的秒数
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    if data is None:
+        cmd.append("-nostdin")
+    cmd += ["-threads", str(FFMPEG_DECODE_THREADS), "-i", file_path]
+    if duration is not None:
+        cmd += ["-t", str(duration)]
+    cmd += ["-f", "s16le", "-ac", "1", "-ar", str(sampling_rate), "-"]
+    p = subprocess.Popen(cmd,
+            stdin=subprocess.PIPE if data is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            creationflags=0 if sys.platform != 'win32' else subprocess.CREATE_NO_WINDOW)
+    outs, errs = p.communicate(input=data)
+    if p.returncode != 0:
+        raise RuntimeError(errs.decode('utf-8', errors='replace').strip() or f"ffmpeg exit code {p.returncode}")
+    return np.frombuffer(outs, np.int16).astype(np.float32) / 32768.0
+
+
 def checkupdate():
     try:
         res=requests.get("https://raw.githubusercontent.com/jianchang512/sts/main/version.json")
@@ -81,4 +108,32 @@ def ms_to_readable_time(*, ms=0, seconds=None):
     minutes = (total_seconds % 3600) // 60
     remaining_seconds = total_seconds % 60
     
-    return f"{hours}小时{minutes}分{remaining_seconds}秒"
\ No newline at end of file
+    return f"{hours}小时{minutes}分{remaining_seconds}秒"
+
+
+def ms_to_time_string_batch(ms_list):
+    # 批量将毫秒转换为 SRT 时间字符串，结果与逐个调用 ms_to_time_string 相同
+    total_seconds, milliseconds = np.divmod(np.asarray(ms_list, dtype=np.int64), 1000)
+    total_minutes, seconds = np.divmod(total_seconds, 60)
+    hours, minutes = np.divmod(total_minutes, 60)
+    hours %= 24
+    return [f"{h:02d}:{m:02d}:{s:02d},{x:03d}" for h, m, s, x in
+            zip(hours.tolist(), minutes.tolist(), seconds.tolist(), milliseconds.tolist())]
+
+
+def ms_to_readable_time_batch(ms_list):
+    # 批量将毫秒转换为易读格式，结果与逐个调用 ms_to_readable_time 相同
+    total_minutes, seconds = np.divmod(np.asarray(ms_list, dtype=np.int64) // 1000, 60)
+    hours, minutes = np.divmod(total_minutes, 60)
+    return [f"{h}小时{m}分{s}秒" for h, m, s in zip(hours.tolist(), minutes.tolist(), seconds.tolist())]
+
+
+def segment_time_strings(segments, data_type):
+    # 批量生成所有片段的 (开始, 结束) 时间字符串，只计算 data_type 实际用到的格式
+    # text 格式不需要时间，返回 (None, None)
+    if data_type == 'text':
+        return [(None, None)] * len(segments)
+    starts = [int(segment.start * 1000) for segment in segments]
+    ends = [int(segment.end * 1000) for segment in segments]
+    formatter = ms_to_readable_time_batch if data_type == 'readable' else ms_to_time_string_batch
+    return list(zip(formatter(starts), formatter(ends)))